@@ -6,10 +6,16 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .data.yt_dlp import get_yt_dlp
 
-from .workers import conversations_periodic_worker, utterances_periodic_worker
+from .config import settings
+from .workers import (
+    conversations_periodic_worker,
+    memory_index_periodic_worker,
+    utterances_periodic_worker,
+)
 
 
 from .data.db import (
+    async_engine,
     get_session,
     init_db,
 )
@@ -20,7 +26,7 @@ from .routers import api
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
-    
+
     yt_dlp_gen = get_yt_dlp()
     yt_dlp = next(yt_dlp_gen)
 
@@ -37,15 +43,27 @@ async def lifespan(app: FastAPI):
         daemon=True,
     )
 
-    conversations_worker_thread.start()
-    utterances_worker_thread.start()
+    worker_threads = [conversations_worker_thread, utterances_worker_thread]
+    if settings.VECTOR_SEARCH_MODE == "memory":
+        # do czasu wczytania indeksu wyszukiwanie działa jak w trybie "compact"
+        worker_threads.append(
+            threading.Thread(
+                target=memory_index_periodic_worker.periodic_worker,
+                args=(stop_event,),
+                daemon=True,
+            )
+        )
+
+    for thread in worker_threads:
+        thread.start()
 
     try:
         yield
     finally:
         stop_event.set()
-        conversations_worker_thread.join()
-        utterances_worker_thread.join()
+        for thread in worker_threads:
+            thread.join()
+        await async_engine.dispose()
 
         try:
             next(yt_dlp_gen)
@@ -7,9 +7,67 @@ class Settings(BaseSettings):
     )
 
     DATABASE_URL: str = ""
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # w milisekundach, 0 wyłącza limit
+    DB_STATEMENT_TIMEOUT: int = 30000
+    DB_ECHO: bool = False
 
     GOOGLE_AI_STUDIO_API_KEY: str = ""
     SPEAKER_DIARIZATION_TOKEN: str = ""
+    # czasy słów z Whispera i podział segmentów na granicach tur mówców
+    # (get_segments(split_by_words=True)) zamiast przypisania całych segmentów
+    WORD_LEVEL_ALIGNMENT: bool = False
+
+    # "google", "onnx" albo "hashing"
+    EMBEDDING_BACKEND: str = "google"
+    EMBEDDING_DIMENSIONS: int = 3072
+    LOCAL_EMBEDDING_MODEL_PATH: str = ""
+
+    # "compact" - wyszukiwanie po halfvec(SEARCH_EMBEDDING_DIMENSIONS) i rerank
+    # pełnym wektorem, "binary" - prefiltr odległością Hamminga po bitach
+    # znaku i rerank pełnym wektorem, "full" - tylko pełny wektor, "memory" -
+    # kandydaci z indeksu w pamięci procesu i rerank pełnym wektorem w bazie
+    VECTOR_SEARCH_MODE: str = "compact"
+    SEARCH_EMBEDDING_DIMENSIONS: int = 768
+    VECTOR_RERANK_FACTOR: int = 4
+    VECTOR_BINARY_RERANK_FACTOR: int = 10
+
+    # indeksy ANN na search_embedding i binary_embedding: "hnsw" albo "ivfflat"
+    VECTOR_INDEX_TYPE: str = "hnsw"
+    VECTOR_INDEX_M: int = 16
+    VECTOR_INDEX_EF_CONSTRUCTION: int = 64
+    VECTOR_INDEX_EF_SEARCH: int = 100
+    VECTOR_INDEX_LISTS: int = 100
+    VECTOR_INDEX_PROBES: int = 10
+    # "auto" (relaxed_order od pgvector 0.8), "off", "relaxed_order" albo
+    # "strict_order" (tylko hnsw); na pgvector < 0.8 zawsze "off"
+    VECTOR_INDEX_ITERATIVE_SCAN: str = "auto"
+
+    # indeks w pamięci dla trybu "memory": wektory "compact" albo "full",
+    # przechowywane jako "float16" albo "float32" (2x pamięci, szybszy ranking)
+    VECTOR_MEMORY_INDEX_SOURCE: str = "compact"
+    VECTOR_MEMORY_INDEX_DTYPE: str = "float16"
+
+    EMBEDDING_BATCH_SIZE: int = 50
+    # po tylu nieudanych próbach worker pomija wypowiedź
+    EMBEDDING_MAX_ATTEMPTS: int = 5
+    EMBEDDING_REQUESTS_PER_MINUTE: float = 30
+    EMBEDDING_BURST: int = 5
+    EMBEDDING_MAX_CONCURRENCY: int = 8
+    EMBEDDING_MAX_RETRIES: int = 5
+    EMBEDDING_BACKOFF_BASE: float = 1.0
+    EMBEDDING_BACKOFF_MAX: float = 60
+    EMBEDDING_CACHE_SIZE: int = 10000
+
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1000
+    QUERY_EMBEDDING_CACHE_TTL: float = 3600
+
+    SEARCH_CACHE_SIZE: int = 1000
+    SEARCH_CACHE_TTL: float = 300
 
 
 settings = Settings()
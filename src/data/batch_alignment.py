@@ -0,0 +1,217 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from .process_data import estimate_duration_from_text
+
+METHOD_NONE = "none"
+METHOD_EXACT = "exact"
+METHOD_MULTIPLE = "multiple"
+
+SEGMENT_DTYPE = np.dtype(
+    [
+        ("start", "f8"),
+        ("end", "f8"),
+        ("speaker", "i4"),
+        ("best_speaker", "i4"),
+        ("score", "f8"),
+        ("method", "U8"),
+    ]
+)
+
+
+class SpeakerArrays(NamedTuple):
+    start: np.ndarray
+    end: np.ndarray
+    speaker: np.ndarray
+    labels: np.ndarray
+
+
+class WhisperArrays(NamedTuple):
+    start: np.ndarray
+    end: np.ndarray
+    estimated_duration: np.ndarray
+    texts: list[str]
+
+
+class BatchAlignment(NamedTuple):
+    segments: np.ndarray
+    texts: list[str]
+    labels: np.ndarray
+    no_speaker: int
+
+
+def speaker_arrays(speaker_data) -> SpeakerArrays:
+    if len(speaker_data) == 0:
+        empty = np.empty(0, dtype="f8")
+        return SpeakerArrays(
+            empty, empty, np.empty(0, dtype="i4"), np.empty(0, dtype="U1")
+        )
+
+    starts, ends, names = zip(*speaker_data)
+    labels, codes = np.unique(np.asarray(names), return_inverse=True)
+    return SpeakerArrays(
+        np.asarray(starts, dtype="f8"),
+        np.asarray(ends, dtype="f8"),
+        codes.astype("i4"),
+        labels,
+    )
+
+
+def whisper_arrays(whisper_data) -> WhisperArrays:
+    segments = whisper_data["segments"]
+    texts = [segment["text"].strip() for segment in segments]
+    return WhisperArrays(
+        np.fromiter((segment["start"] for segment in segments), "f8", len(segments)),
+        np.fromiter((segment["end"] for segment in segments), "f8", len(segments)),
+        np.fromiter(
+            (estimate_duration_from_text(text) for text in texts), "f8", len(texts)
+        ),
+        texts,
+    )
+
+
+def _expand_ranges(owner, lo, hi):
+    """Dla każdego owner[i] wszystkie indeksy z [lo[i], hi[i]) jako pary."""
+    counts = np.maximum(hi - lo, 0)
+    owners = np.repeat(owner, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, np.repeat(lo, counts) + offsets
+
+
+def _candidate_pairs(turn_start, turn_end, w_start, w_end):
+    """
+    Zwraca pary (segment, tura), które nachodzą na siebie.
+
+    Para nachodzi, gdy tura zaczyna się w segmencie (w_start <= turn_start
+    < w_end) albo segment zaczyna się w turze (turn_start < w_start <
+    turn_end) - oba przypadki są rozłączne i każdy to jeden searchsorted
+    po posortowanych początkach. Liczba par jest więc równa liczbie
+    faktycznych nałożeń, także gdy jedna długa tura przykrywa wiele
+    segmentów. Tury muszą być posortowane po początku.
+    """
+    lo = np.searchsorted(turn_start, w_start, side="left")
+    hi = np.searchsorted(turn_start, w_end, side="left")
+    seg_a, turn_a = _expand_ranges(np.arange(len(w_start)), lo, hi)
+
+    by_start = np.argsort(w_start, kind="stable")
+    sorted_start = w_start[by_start]
+    lo = np.searchsorted(sorted_start, turn_start, side="right")
+    hi = np.searchsorted(sorted_start, turn_end, side="left")
+    turn_b, position = _expand_ranges(np.arange(len(turn_start)), lo, hi)
+
+    return (
+        np.concatenate([seg_a, by_start[position]]),
+        np.concatenate([turn_a, turn_b]),
+    )
+
+
+def combine_segments_batch(
+    speaker_data, whisper_data, min_overlap_ratio=0.25
+) -> BatchAlignment:
+    """
+    Wektorowa wersja combine_segments zwracająca tablicę strukturalną.
+
+    Kolumna speaker to indeks w labels (-1 dla UNKNOWN). best_speaker i score
+    trzymają najlepsze dopasowanie segmentów "multiple" niezależnie od progu,
+    więc apply_threshold może przeliczyć wynik dla innego min_overlap_ratio
+    bez ponownego liczenia nakładania.
+    """
+    speakers = speaker_arrays(speaker_data)
+    whisper = whisper_arrays(whisper_data)
+    segment_count = len(whisper.texts)
+
+    segments = np.zeros(segment_count, dtype=SEGMENT_DTYPE)
+    segments["start"] = whisper.start
+    segments["end"] = whisper.end
+    segments["speaker"] = -1
+    segments["best_speaker"] = -1
+    segments["method"] = METHOD_NONE
+
+    if segment_count == 0 or len(speakers.start) == 0:
+        return BatchAlignment(segments, whisper.texts, speakers.labels, segment_count)
+
+    order = np.argsort(speakers.start, kind="stable")
+    turn_start = speakers.start[order]
+    turn_end = speakers.end[order]
+
+    seg, turn = _candidate_pairs(turn_start, turn_end, whisper.start, whisper.end)
+    w_start = whisper.start[seg]
+    w_end = whisper.end[seg]
+    s_start = turn_start[turn]
+    s_end = turn_end[turn]
+
+    overlap = np.maximum(0, np.minimum(w_end, s_end) - np.maximum(w_start, s_start))
+    estimated_duration = whisper.estimated_duration[seg]
+    matched = (overlap > 0) & ~(estimated_duration / 2 > (s_end - s_start))
+
+    seg = seg[matched]
+    original_turn = order[turn[matched]]
+    w_start, w_end = w_start[matched], w_end[matched]
+    s_start, s_end = s_start[matched], s_end[matched]
+    overlap = overlap[matched]
+
+    match_count = np.bincount(seg, minlength=segment_count)
+
+    # calculate_overlap_score(...) / duration, tak jak w _label_segment
+    duration = w_end - w_start
+    ratio_w = np.minimum(1.0, overlap / np.maximum(duration, 1e-6))
+    ratio_s = np.minimum(1.0, overlap / np.maximum(s_end - s_start, 1e-6))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = np.where(duration > 0, ratio_w * ratio_s / duration, 0.0)
+
+    # najlepszy wynik na segment; remis wygrywa wcześniejsza tura w speaker_data
+    best = np.lexsort((original_turn, -score, seg))
+    first = np.ones(len(best), dtype=bool)
+    first[1:] = seg[best][1:] != seg[best][:-1]
+    best = best[first]
+    best_segment = seg[best]
+    best_score = score[best]
+    best_speaker = speakers.speaker[original_turn[best]]
+
+    segments["score"][best_segment] = best_score
+    segments["best_speaker"][best_segment] = np.where(best_score > 0, best_speaker, -1)
+
+    exact = match_count[best_segment] == 1
+    segments["method"][best_segment[exact]] = METHOD_EXACT
+    segments["method"][best_segment[~exact]] = METHOD_MULTIPLE
+    segments["speaker"][best_segment[exact]] = best_speaker[exact]
+
+    return apply_threshold(
+        BatchAlignment(segments, whisper.texts, speakers.labels, 0), min_overlap_ratio
+    )
+
+
+def apply_threshold(alignment: BatchAlignment, min_overlap_ratio) -> BatchAlignment:
+    """Przelicza mówców segmentów "multiple" dla nowego progu."""
+    segments = alignment.segments.copy()
+    multiple = segments["method"] == METHOD_MULTIPLE
+    accepted = (
+        multiple
+        & (segments["best_speaker"] >= 0)
+        & (segments["score"] >= min_overlap_ratio)
+    )
+
+    segments["speaker"][multiple] = -1
+    segments["speaker"][accepted] = segments["best_speaker"][accepted]
+
+    no_speaker = int(np.count_nonzero(segments["speaker"] < 0))
+    return BatchAlignment(segments, alignment.texts, alignment.labels, no_speaker)
+
+
+def to_segments(alignment: BatchAlignment) -> list[dict]:
+    """Zamienia wynik wsadowy na listę słowników w formacie combine_segments."""
+    labels = alignment.labels.tolist()
+    combined_segments = []
+    for row, text in zip(alignment.segments.tolist(), alignment.texts):
+        start, end, speaker, _, _, method = row
+        combined_segments.append(
+            {
+                "start": start,
+                "end": end,
+                "text": text,
+                "speaker": labels[speaker] if speaker >= 0 else "UNKNOWN",
+                "method": method,
+            }
+        )
+    return combined_segments
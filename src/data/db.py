@@ -1,72 +1,632 @@
 import datetime
+from contextlib import contextmanager
+from functools import cache
+from typing import Optional
 
+from pgvector.sqlalchemy import BIT
+from sqlalchemy import Integer, Text, bindparam, make_url
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import contains_eager, defer, selectinload
 from sqlmodel import (
     Session,
     SQLModel,
+    cast,
     create_engine,
     func,
+    literal_column,
     select,
     text,
 )
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .entities import Conversation, Speaker, Utterance
+from .memory_index import memory_index
+from .query_metrics import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    instrument_engine,
+)
+from .vectors import SEARCH_DIMENSIONS, binary_quantize, compact_embedding
 
 from ..config import settings
 
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    echo=settings.DB_ECHO,
+)
+
 engine = create_engine(
     settings.DATABASE_URL,
-    echo=True,
+    poolclass=InstrumentedQueuePool,
+    connect_args={"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT}"},
+    **POOL_OPTIONS,
+)
+
+# ta sama baza przez asyncpg dla endpointów API; wektory przechodzą tekstowo,
+# tak jak przez psycopg2, więc typy pgvector działają bez rejestracji kodeków
+async_engine = create_async_engine(
+    make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg"),
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args={
+        "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)}
+    },
+    **POOL_OPTIONS,
 )
 
+instrument_engine(engine)
+instrument_engine(async_engine)
+
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+
+async def get_async_session():
+    # bez expire_on_commit - po commit nie da się leniwie doczytać atrybutów
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 def get_raw_session():
     return Session(engine)
 
+
+def get_async_raw_session():
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+
+@contextmanager
+def _maintenance_connection():
+    """
+    Połączenie w trybie AUTOCOMMIT (wymaganym przez CONCURRENTLY) i bez
+    statement_timeout, na czas budowy indeksów.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SET statement_timeout = 0"))
+        try:
+            yield conn
+        finally:
+            conn.execute(text("RESET statement_timeout"))
+
+
 def init_db():
     with Session(engine) as session:
         session.exec(text("CREATE EXTENSION IF NOT EXISTS vector"))
         session.commit()
+    pgvector_version.cache_clear()
 
     SQLModel.metadata.create_all(engine)
 
+    with Session(engine) as session:
+        # uzupełnianie kolumn trwa dłużej niż limit dla zwykłych zapytań
+        session.exec(text("SET LOCAL statement_timeout = 0"))
+        # create_all nie dodaje kolumn do istniejących tabel
+        session.exec(
+            text(
+                "ALTER TABLE utterance ADD COLUMN IF NOT EXISTS "
+                f"search_embedding halfvec({SEARCH_DIMENSIONS})"
+            )
+        )
+        session.exec(
+            text(
+                "ALTER TABLE utterance ADD COLUMN IF NOT EXISTS "
+                f"binary_embedding bit({settings.EMBEDDING_DIMENSIONS})"
+            )
+        )
+        session.exec(
+            text(
+                "ALTER TABLE utterance ADD COLUMN IF NOT EXISTS "
+                "embedding_attempts integer NOT NULL DEFAULT 0"
+            )
+        )
+        session.exec(
+            text(
+                "UPDATE utterance SET search_embedding = "
+                f"l2_normalize(subvector(embedding, 1, {SEARCH_DIMENSIONS}))"
+                f"::halfvec({SEARCH_DIMENSIONS}) "
+                "WHERE embedding IS NOT NULL AND search_embedding IS NULL"
+            )
+        )
+        session.exec(
+            text(
+                "UPDATE utterance SET binary_embedding = binary_quantize(embedding) "
+                "WHERE embedding IS NOT NULL AND binary_embedding IS NULL"
+            )
+        )
+        session.commit()
 
-def similarity_search(
+    add_tsvector_columns()
+    ensure_vector_indexes()
+    ensure_tsvector_indexes()
+
+    with _maintenance_connection() as conn:
+        # stronicowanie wypowiedzi rozmowy po (start_time, id)
+        conn.execute(
+            text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                "utterance_conversation_start_time_idx "
+                "ON utterance (conversation_id, start_time, id)"
+            )
+        )
+
+
+# wyliczane przez bazę kolumny tsvector dla używanych konfiguracji FTS; nie ma
+# ich w modelu, żeby INSERT nie próbował wpisywać do nich wartości
+TSVECTOR_COLUMNS = {
+    "simple": "text_tsv_simple",
+    "polish": "text_tsv_polish",
+    "english": "text_tsv_english",
+}
+
+
+def add_tsvector_columns():
+    """
+    Dodaje kolumny tylko dla konfiguracji, które istnieją w bazie - "polish"
+    nie jest wbudowana w PostgreSQL i wymaga własnego słownika.
+    """
+    with Session(engine) as session:
+        # dodanie kolumny wyliczanej przepisuje całą tabelę
+        session.exec(text("SET LOCAL statement_timeout = 0"))
+        configs = set(session.exec(text("SELECT cfgname FROM pg_ts_config")).scalars())
+        for language, column_name in TSVECTOR_COLUMNS.items():
+            if language not in configs:
+                continue
+            session.exec(
+                text(
+                    f"ALTER TABLE utterance ADD COLUMN IF NOT EXISTS {column_name} "
+                    f"tsvector GENERATED ALWAYS AS "
+                    f"(to_tsvector('{language}'::regconfig, coalesce(text, ''))) STORED"
+                )
+            )
+        session.commit()
+    tsvector_languages.cache_clear()
+
+
+@cache
+def tsvector_languages() -> frozenset[str]:
+    """Konfiguracje FTS, dla których tabela ma już kolumnę tsvector."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = 'utterance' AND column_name = ANY(:names)"
+            ),
+            {"names": list(TSVECTOR_COLUMNS.values())},
+        )
+        existing = {row[0] for row in rows}
+    return frozenset(
+        language
+        for language, column_name in TSVECTOR_COLUMNS.items()
+        if column_name in existing
+    )
+
+
+def ensure_tsvector_indexes():
+    with _maintenance_connection() as conn:
+        names = [
+            f"{TSVECTOR_COLUMNS[language]}_idx" for language in tsvector_languages()
+        ]
+        for name in _invalid_indexes(conn, names):
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        for language in tsvector_languages():
+            column_name = TSVECTOR_COLUMNS[language]
+            conn.execute(
+                text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {column_name}_idx "
+                    f"ON utterance USING gin ({column_name})"
+                )
+            )
+
+
+# kolumna i klasa operatorów indeksu ANN dla trybu wyszukiwania; pełny
+# embedding ma za dużo wymiarów na indeks, więc "full" zawsze skanuje tabelę
+VECTOR_INDEXES = {
+    "compact": (
+        "utterance_search_embedding_ann_idx",
+        "search_embedding",
+        "halfvec_cosine_ops",
+    ),
+    "binary": (
+        "utterance_binary_embedding_ann_idx",
+        "binary_embedding",
+        "bit_hamming_ops",
+    ),
+}
+
+
+def _vector_index_ddl(name: str, column: str, opclass: str) -> str:
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        options = (
+            f"m = {int(settings.VECTOR_INDEX_M)}, "
+            f"ef_construction = {int(settings.VECTOR_INDEX_EF_CONSTRUCTION)}"
+        )
+    elif settings.VECTOR_INDEX_TYPE == "ivfflat":
+        options = f"lists = {int(settings.VECTOR_INDEX_LISTS)}"
+    else:
+        raise ValueError(f"Unknown vector index type: {settings.VECTOR_INDEX_TYPE}")
+
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON utterance "
+        f"USING {settings.VECTOR_INDEX_TYPE} ({column} {opclass}) WITH ({options})"
+    )
+
+
+def _index_validity(connection, names: list[str]) -> dict[str, bool]:
+    # przerwane CREATE INDEX CONCURRENTLY zostawia nieważny indeks
+    rows = connection.execute(
+        text(
+            "SELECT c.relname, i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = ANY(:names)"
+        ),
+        {"names": names},
+    )
+    return {name: valid for name, valid in rows}
+
+
+def _invalid_indexes(connection, names: list[str]) -> set[str]:
+    validity = _index_validity(connection, names)
+    return {name for name, valid in validity.items() if not valid}
+
+
+def _swap_vector_index(name: str, new_name: str) -> None:
+    """Stary indeks znika i nowy przejmuje jego nazwę w jednej transakcji."""
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {name}"))
+
+
+def _cleanup_vector_index(conn, name: str) -> None:
+    """
+    Usuwa pozostałości przerwanej budowy: nieważny indeks i indeks _new
+    z przebudowy. Gotowy _new bez indeksu docelowego (przerwana zamiana
+    sprzed wprowadzenia _swap_vector_index) przejmuje jego nazwę.
+    """
+    new_name = f"{name}_new"
+    validity = _index_validity(conn, [name, new_name])
+    if validity.get(name) is False:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        del validity[name]
+    if new_name in validity:
+        if validity[new_name] and name not in validity:
+            conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {name}"))
+        else:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}"))
+
+
+def ensure_vector_indexes():
+    """
+    Tworzy brakujące indeksy ANN bez blokowania zapisów (CONCURRENTLY,
+    więc poza transakcją). Istniejące indeksy nie są zmieniane - po zmianie
+    parametrów trzeba wywołać rebuild_vector_indexes().
+    """
+    with _maintenance_connection() as conn:
+        for name, column, opclass in VECTOR_INDEXES.values():
+            _cleanup_vector_index(conn, name)
+            conn.execute(text(_vector_index_ddl(name, column, opclass)))
+
+
+def rebuild_vector_indexes(modes: Optional[list[str]] = None):
+    """
+    Buduje indeksy od nowa z bieżącymi parametrami. Nowy indeks powstaje
+    obok starego i zastępuje go dopiero po zbudowaniu, więc wyszukiwanie
+    korzysta z indeksu przez cały czas przebudowy.
+    """
+    with _maintenance_connection() as conn:
+        for mode in modes or list(VECTOR_INDEXES):
+            name, column, opclass = VECTOR_INDEXES[mode]
+            new_name = f"{name}_new"
+            _cleanup_vector_index(conn, name)
+            conn.execute(text(_vector_index_ddl(new_name, column, opclass)))
+            _swap_vector_index(name, new_name)
+
+
+@cache
+def pgvector_version() -> tuple[int, ...]:
+    with engine.connect() as conn:
+        version = conn.execute(
+            text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        ).scalar()
+    return tuple(int(part) for part in (version or "0").split("."))
+
+
+def iterative_scan() -> str:
+    """Tryb iterative_scan indeksu ANN; parametr istnieje od pgvector 0.8."""
+    if pgvector_version() < (0, 8):
+        return "off"
+    if settings.VECTOR_INDEX_ITERATIVE_SCAN == "auto":
+        return "relaxed_order"
+    return settings.VECTOR_INDEX_ITERATIVE_SCAN
+
+
+def _index_search_options(candidates: int):
+    """
+    Parametry skanu indeksu tylko dla bieżącej transakcji (jedno zapytanie
+    set_config). ef_search nie może być mniejszy niż liczba kandydatów,
+    inaczej HNSW zwróci ich za mało.
+    """
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        ef_search = min(1000, max(settings.VECTOR_INDEX_EF_SEARCH, candidates))
+        options = {"hnsw.ef_search": str(ef_search)}
+    else:
+        options = {"ivfflat.probes": str(settings.VECTOR_INDEX_PROBES)}
+    if iterative_scan() != "off":
+        # przy filtrach indeks sam dobiera kolejnych kandydatów
+        options[f"{settings.VECTOR_INDEX_TYPE}.iterative_scan"] = iterative_scan()
+
+    return select(
+        *(func.set_config(name, value, True) for name, value in options.items())
+    )
+
+
+def apply_filters(
+    stmt,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+):
+    if start_date is not None:
+        stmt = stmt.where(
+            Utterance.conversation.has(Conversation.conversation_date >= start_date)
+        )
+
+    if end_date is not None:
+        stmt = stmt.where(
+            Utterance.conversation.has(Conversation.conversation_date <= end_date)
+        )
+
+    if speaker_id is not None:
+        stmt = stmt.where(Utterance.speaker_id == speaker_id)
+
+    if conversation_id is not None:
+        stmt = stmt.where(Utterance.conversation_id == conversation_id)
+
+    return stmt
+
+
+# odpowiedzi API nie zwracają embeddingów, więc nie ma po co ich czytać
+DEFER_EMBEDDINGS = (
+    defer(Utterance.embedding),
+    defer(Utterance.search_embedding),
+    defer(Utterance.binary_embedding),
+)
+
+# mówca i rozmowa ładowane z góry dwoma zapytaniami IN (bez N+1 przy budowaniu
+# UtteranceDTO)
+UTTERANCE_LISTING_OPTIONS = (
+    selectinload(Utterance.speaker),
+    selectinload(Utterance.conversation),
+    *DEFER_EMBEDDINGS,
+)
+
+
+def _first_stage(query_embedding: list[float], mode: str):
+    """
+    Kolumna i odległość pierwszego etapu oraz mnożnik liczby kandydatów
+    dla trybu wyszukiwania (None dla "full").
+    """
+    if mode == "compact":
+        distance = Utterance.search_embedding.cosine_distance(
+            compact_embedding(query_embedding)
+        )
+        return Utterance.search_embedding, distance, settings.VECTOR_RERANK_FACTOR
+    if mode == "binary":
+        distance = Utterance.binary_embedding.hamming_distance(
+            # przez text - asyncpg nie przyjmuje napisu jako parametru typu bit
+            cast(
+                cast(binary_quantize(query_embedding), Text),
+                BIT(settings.EMBEDDING_DIMENSIONS),
+            )
+        )
+        return (
+            Utterance.binary_embedding,
+            distance,
+            settings.VECTOR_BINARY_RERANK_FACTOR,
+        )
+    if mode == "full":
+        return None
+    raise ValueError(f"Unknown vector search mode: {mode}")
+
+
+def _memory_similarity_stmt(
     query_embedding: list[float],
+    distance,
     limit: int,
     speaker_id: int,
     conversation_id: int,
     start_date: datetime.date,
     end_date: datetime.date,
-    session: Session,
-) -> list[Utterance]:
+):
+    rerank_factor = 1
+    if memory_index.source == "compact":
+        rerank_factor = settings.VECTOR_RERANK_FACTOR
+    ids = memory_index.search(
+        query_embedding,
+        limit * rerank_factor,
+        speaker_id,
+        conversation_id,
+        start_date,
+        end_date,
+    )
+    # filtry jeszcze raz w SQL - indeks może być chwilę za bazą
     stmt = (
         select(Utterance)
+        .where(Utterance.id.in_(ids))
         .where(Utterance.embedding != None)
         .join(Speaker)
-        .order_by(Utterance.embedding.cosine_distance(query_embedding))
+        .order_by(distance)
+        .limit(limit)
     )
+    return apply_filters(stmt, speaker_id, conversation_id, start_date, end_date)
 
-    if start_date is not None:
-        stmt = stmt.where(Utterance.conversation.has(Conversation.conversation_date >= start_date))
 
-    if end_date is not None:
-        stmt = stmt.where(Utterance.conversation.has(Conversation.conversation_date <= end_date))
+def _similarity_stmt(
+    query_embedding: list[float],
+    limit: int,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    mode: Optional[str] = None,
+):
+    """
+    Zapytanie similarity_search, wyrażenie, po którym jest sortowane, oraz
+    zapytanie ustawiające parametry indeksu ANN (None, gdy indeks nie jest
+    używany), które trzeba wykonać wcześniej w tej samej transakcji.
+    """
+    mode = mode or settings.VECTOR_SEARCH_MODE
+    distance = Utterance.embedding.cosine_distance(query_embedding)
 
-    if speaker_id is not None:
-        stmt = stmt.where(Utterance.speaker_id == speaker_id)
+    if mode == "memory":
+        if limit is not None and memory_index.ready:
+            stmt = _memory_similarity_stmt(
+                query_embedding,
+                distance,
+                limit,
+                speaker_id,
+                conversation_id,
+                start_date,
+                end_date,
+            )
+            return stmt, distance, None
+        # indeks jeszcze się wczytuje
+        mode = "compact"
 
-    if conversation_id is not None:
-        stmt = stmt.where(Utterance.conversation_id == conversation_id)
+    first_stage = _first_stage(query_embedding, mode)
+
+    if first_stage is not None and limit is not None:
+        column, first_distance, rerank_factor = first_stage
+        filters = (speaker_id, conversation_id, start_date, end_date)
+        # bez iterative_scan indeks zwraca ef_search najbliższych i dopiero
+        # one są filtrowane, więc przy filtrach zostałoby mniej niż limit
+        # wierszy; wyrażenie inne niż w indeksie wymusza dokładny skan
+        exact = iterative_scan() == "off" and any(f is not None for f in filters)
+        candidates = (
+            select(Utterance.id)
+            .where(column != None)
+            .join(Speaker)
+            .order_by(first_distance + 0 if exact else first_distance)
+            .limit(limit * rerank_factor)
+        )
+        candidates = apply_filters(candidates, *filters)
+        stmt = (
+            select(Utterance)
+            .where(Utterance.id.in_(candidates.scalar_subquery()))
+            .order_by(distance)
+            .limit(limit)
+        )
+        if exact:
+            return stmt, distance, None
+        return stmt, distance, _index_search_options(limit * rerank_factor)
+
+    stmt = (
+        select(Utterance)
+        .where(Utterance.embedding != None)
+        .join(Speaker)
+        .order_by(distance)
+    )
+    stmt = apply_filters(stmt, speaker_id, conversation_id, start_date, end_date)
 
     if limit is not None:
         stmt = stmt.limit(limit)
 
-    results = session.exec(stmt).all()
-    return results
+    return stmt, distance, None
+
+
+def similarity_search(
+    query_embedding: list[float],
+    limit: int,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    session: Session,
+    mode: Optional[str] = None,
+) -> list[Utterance]:
+    """
+    W trybach "compact" i "binary" kandydaci (limit razy mnożnik z ustawień)
+    są wybierani po krótkim wektorze halfvec albo odległości Hamminga bitów
+    znaku, a pełny embedding służy tylko do ułożenia tych kandydatów
+    w ostatecznej kolejności. W trybie "memory" kandydatów wybiera
+    memory_index w procesie, a baza tylko czyta je po kluczu.
+    """
+    stmt, _, index_options = _similarity_stmt(
+        query_embedding,
+        limit,
+        speaker_id,
+        conversation_id,
+        start_date,
+        end_date,
+        mode,
+    )
+    if index_options is not None:
+        session.exec(index_options)
+    return session.exec(stmt.options(*UTTERANCE_LISTING_OPTIONS)).all()
+
+
+async def asimilarity_search(
+    query_embedding: list[float],
+    limit: int,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    session: AsyncSession,
+    mode: Optional[str] = None,
+) -> list[Utterance]:
+    """similarity_search dla AsyncSession."""
+    stmt, _, index_options = _similarity_stmt(
+        query_embedding,
+        limit,
+        speaker_id,
+        conversation_id,
+        start_date,
+        end_date,
+        mode,
+    )
+    if index_options is not None:
+        await session.exec(index_options)
+    return (await session.exec(stmt.options(*UTTERANCE_LISTING_OPTIONS))).all()
+
+
+def _full_text_stmt(
+    query: str,
+    limit: int,
+    language: str,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+):
+    """
+    Zapytanie full_text_search i wyrażenie rangi, po którym jest sortowane.
+    Dla konfiguracji z kolumną tsvector (TSVECTOR_COLUMNS) korzysta z niej
+    i jej indeksu GIN, dla pozostałych liczy to_tsvector w zapytaniu.
+    """
+    if language in tsvector_languages():
+        document = literal_column(
+            f"utterance.{TSVECTOR_COLUMNS[language]}", type_=TSVECTOR
+        )
+    else:
+        document = func.to_tsvector(language, Utterance.text)
+    ts_query = func.websearch_to_tsquery(language, query)
+    rank = func.ts_rank(document, ts_query)
+
+    stmt = select(Utterance).where(document.op("@@@")(ts_query)).order_by(rank.desc())
+
+    stmt = apply_filters(stmt, speaker_id, conversation_id, start_date, end_date)
+
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    return stmt, rank
 
 
 def full_text_search(
@@ -79,44 +639,218 @@ def full_text_search(
     end_date: datetime.date,
     session: Session,
 ) -> list[Utterance]:
-    stmt = (
-        select(
-            Utterance,
-            func.ts_rank(
-                func.to_tsvector(language, Utterance.text),
-                func.websearch_to_tsquery(language, query),
-            ).label("rank"),
-        )
-        .where(
-            func.to_tsvector(language, Utterance.text).op("@@@")(
-                func.websearch_to_tsquery(language, query)
-            )
-        )
-        .order_by(
-            func.ts_rank(
-                func.to_tsvector(language, Utterance.text),
-                func.websearch_to_tsquery(language, query),
-            ).desc()
-        )
+    stmt, _ = _full_text_stmt(
+        query, limit, language, speaker_id, conversation_id, start_date, end_date
     )
+    return session.exec(stmt.options(*UTTERANCE_LISTING_OPTIONS)).all()
 
-    if start_date is not None:
-        stmt = stmt.where(Utterance.conversation.has(Conversation.conversation_date >= start_date))
 
-    if end_date is not None:
-        stmt = stmt.where(Utterance.conversation.has(Conversation.conversation_date <= end_date))
+async def afull_text_search(
+    query: str,
+    limit: int,
+    language: str,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    session: AsyncSession,
+) -> list[Utterance]:
+    """full_text_search dla AsyncSession."""
+    stmt, _ = _full_text_stmt(
+        query, limit, language, speaker_id, conversation_id, start_date, end_date
+    )
+    return (await session.exec(stmt.options(*UTTERANCE_LISTING_OPTIONS))).all()
 
-    if speaker_id is not None:
-        stmt = stmt.where(Utterance.speaker_id == speaker_id)
 
-    if conversation_id is not None:
-        stmt = stmt.where(Utterance.conversation_id == conversation_id)
+def _ranked_ids(stmt, order_by, name: str):
+    """CTE (id, position) z pozycją wyniku w rankingu, liczoną od 1."""
+    return stmt.with_only_columns(
+        Utterance.id,
+        func.row_number().over(order_by=order_by).label("position"),
+    ).cte(name)
+
+
+def _hybrid_fetch_limit(limit: int) -> int:
+    return limit * 2 if limit else 40
+
+
+def _hybrid_text_ranking_stmt(
+    query: str,
+    limit: int,
+    language: str,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+):
+    stmt, _ = _full_text_stmt(
+        query,
+        _hybrid_fetch_limit(limit),
+        language,
+        speaker_id,
+        conversation_id,
+        start_date,
+        end_date,
+    )
+    return stmt.with_only_columns(Utterance.id)
 
+
+def hybrid_text_ranking(
+    query: str,
+    limit: int,
+    language: str,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    session: Session,
+) -> list[int]:
+    """
+    Ranking pełnotekstowy hybrid_search jako lista id - można go policzyć,
+    zanim embedding zapytania będzie gotowy, i przekazać jako fts_ids.
+    """
+    stmt = _hybrid_text_ranking_stmt(
+        query, limit, language, speaker_id, conversation_id, start_date, end_date
+    )
+    return session.exec(stmt).all()
+
+
+async def ahybrid_text_ranking(
+    query: str,
+    limit: int,
+    language: str,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    session: AsyncSession,
+) -> list[int]:
+    """hybrid_text_ranking dla AsyncSession."""
+    stmt = _hybrid_text_ranking_stmt(
+        query, limit, language, speaker_id, conversation_id, start_date, end_date
+    )
+    return (await session.exec(stmt)).all()
+
+
+def _hybrid_stmt(
+    query: str,
+    query_embedding: list[float],
+    limit: int,
+    language: str,
+    rrf_k: int,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    fts_ids: Optional[list[int]] = None,
+):
+    fetch_limit = _hybrid_fetch_limit(limit)
+    filters = (speaker_id, conversation_id, start_date, end_date)
+
+    if fts_ids is None:
+        fts_stmt, rank = _full_text_stmt(query, fetch_limit, language, *filters)
+        fts = _ranked_ids(fts_stmt, rank.desc(), "fts_ranked")
+    else:
+        ranked = (
+            func.unnest(bindparam("fts_ids", list(fts_ids), type_=ARRAY(Integer)))
+            .table_valued("id", with_ordinality="position")
+            .render_derived()
+        )
+        fts = select(ranked.c.id, ranked.c.position).cte("fts_ranked")
+
+    sim_stmt, distance, index_options = _similarity_stmt(
+        query_embedding, fetch_limit, *filters
+    )
+    sim = _ranked_ids(sim_stmt, distance, "similarity_ranked")
+
+    # pozycje od 0, jak w dotychczasowej fuzji po stronie Pythona
+    score = func.coalesce(1.0 / (rrf_k + fts.c.position - 1), 0) + func.coalesce(
+        1.0 / (rrf_k + sim.c.position - 1), 0
+    )
+    fused = (
+        select(func.coalesce(fts.c.id, sim.c.id).label("id"), score.label("score"))
+        .select_from(fts.join(sim, fts.c.id == sim.c.id, full=True))
+        .order_by(score.desc())
+    )
     if limit is not None:
-        stmt = stmt.limit(limit)
+        fused = fused.limit(limit)
+    fused = fused.cte("fused")
+
+    stmt = (
+        select(Utterance)
+        .join(fused, fused.c.id == Utterance.id)
+        .join(Utterance.conversation)
+        .outerjoin(Utterance.speaker)
+        .options(contains_eager(Utterance.conversation))
+        .options(contains_eager(Utterance.speaker))
+        .options(*DEFER_EMBEDDINGS)
+        .order_by(fused.c.score.desc(), Utterance.id)
+    )
+    return stmt, index_options
+
+
+def hybrid_search(
+    query: str,
+    query_embedding: list[float],
+    limit: int,
+    language: str,
+    rrf_k: int,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    session: Session,
+    fts_ids: Optional[list[int]] = None,
+) -> list[Utterance]:
+    """
+    Oba rankingi (po limit * 2 wyników) i Reciprocal Rank Fusion w jednym
+    zapytaniu. Zwraca tylko ostateczne wyniki, z mówcą i rozmową
+    wczytanymi w tym samym zapytaniu. Gotowy ranking z hybrid_text_ranking
+    (fts_ids) zastępuje wyszukiwanie pełnotekstowe.
+    """
+    stmt, index_options = _hybrid_stmt(
+        query,
+        query_embedding,
+        limit,
+        language,
+        rrf_k,
+        speaker_id,
+        conversation_id,
+        start_date,
+        end_date,
+        fts_ids,
+    )
+    if index_options is not None:
+        session.exec(index_options)
+    return session.exec(stmt).all()
 
-    utterances = []
-    for utterance, rank in session.exec(stmt).all():
-        utterances.append(utterance)
 
-    return utterances
+async def ahybrid_search(
+    query: str,
+    query_embedding: list[float],
+    limit: int,
+    language: str,
+    rrf_k: int,
+    speaker_id: int,
+    conversation_id: int,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    session: AsyncSession,
+    fts_ids: Optional[list[int]] = None,
+) -> list[Utterance]:
+    """hybrid_search dla AsyncSession."""
+    stmt, index_options = _hybrid_stmt(
+        query,
+        query_embedding,
+        limit,
+        language,
+        rrf_k,
+        speaker_id,
+        conversation_id,
+        start_date,
+        end_date,
+        fts_ids,
+    )
+    if index_options is not None:
+        await session.exec(index_options)
+    return (await session.exec(stmt)).all()
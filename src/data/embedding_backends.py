@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import math
+from abc import ABC, abstractmethod
+from functools import cache
+from pathlib import Path
+
+from ..config import settings
+from .embedding_client import get_embedding_client
+from .googleapi import EMBEDDING_MODEL, get_embeddings
+
+
+class EmbeddingBackend(ABC):
+    """
+    Źródło embeddingów. name i dimensions trafiają do klucza cache, więc
+    wektory z różnych backendów nigdy się nie mieszają.
+    """
+
+    name: str
+    dimensions: int
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> list[list[float]]: ...
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class GoogleEmbeddingBackend(EmbeddingBackend):
+    def __init__(self, dimensions: int):
+        self.name = EMBEDDING_MODEL
+        self.dimensions = dimensions
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        response = get_embeddings(texts)
+        return [embedding.values for embedding in response.embeddings]
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        return await get_embedding_client().embed(texts)
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministyczny zamiennik bez sieci i modelu: słowa i ich trigramy
+    znakowe są haszowane do wektora ze znakiem i normalizowane. Teksty
+    o wspólnych słowach są blisko, co wystarcza do testów, także obciążeniowych.
+    """
+
+    def __init__(self, dimensions: int):
+        self.name = "hashing-v1"
+        self.dimensions = dimensions
+
+    def _features(self, text: str):
+        for word in text.lower().split():
+            yield word
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i : i + 3]
+
+    def _embed_one(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm == 0:
+            # pusty tekst - wektor zerowy dałby NaN w odległości kosinusowej
+            vector[0] = 1.0
+            return vector
+        return [value / norm for value in vector]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed_one(text) for text in texts]
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    Lokalny model zdaniowy na CPU (np. all-MiniLM-L6-v2 wyeksportowany do
+    ONNX). Katalog modelu musi zawierać model.onnx i tokenizer.json;
+    embeddingi to uśredniony (mean pooling) i znormalizowany ostatni stan
+    ukryty. Teksty idą do modelu paczkami po batch_size, bo paczka jest
+    dopełniana do najdłuższego tekstu. Wymaga pakietów onnxruntime
+    i tokenizers.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        dimensions: int,
+        max_length: int = 256,
+        batch_size: int = 32,
+    ):
+        try:
+            import numpy as np
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backend requires numpy, onnxruntime and tokenizers"
+            ) from e
+
+        path = Path(model_path)
+        self._np = np
+        self._session = onnxruntime.InferenceSession(
+            str(path / "model.onnx"), providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {
+            model_input.name for model_input in self._session.get_inputs()
+        }
+        self._tokenizer = Tokenizer.from_file(str(path / "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+
+        self.name = f"onnx:{path.name}"
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+
+    def _embed_batch(self, texts: list[str]):
+        np = self._np
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array(
+            [encoding.attention_mask for encoding in encodings], dtype=np.int64
+        )
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array(
+                [encoding.type_ids for encoding in encodings], dtype=np.int64
+            )
+        hidden = self._session.run(None, feeds)[0]
+
+        mask = attention_mask[..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+        if pooled.shape[1] != self.dimensions:
+            raise ValueError(
+                f"Model returns {pooled.shape[1]}-dimensional embeddings, "
+                f"but EMBEDDING_DIMENSIONS is {self.dimensions}"
+            )
+        return pooled
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        return self._np.concatenate(
+            [
+                self._embed_batch(texts[start : start + self.batch_size])
+                for start in range(0, len(texts), self.batch_size)
+            ]
+        ).tolist()
+
+
+@cache
+def get_embedding_backend() -> EmbeddingBackend:
+    backend = settings.EMBEDDING_BACKEND
+    if backend == "google":
+        return GoogleEmbeddingBackend(settings.EMBEDDING_DIMENSIONS)
+    if backend == "hashing":
+        return HashingEmbeddingBackend(settings.EMBEDDING_DIMENSIONS)
+    if backend == "onnx":
+        return OnnxEmbeddingBackend(
+            settings.LOCAL_EMBEDDING_MODEL_PATH,
+            settings.EMBEDDING_DIMENSIONS,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+        )
+    raise ValueError(f"Unknown embedding backend: {backend}")
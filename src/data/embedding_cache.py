@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+
+from ..config import settings
+from .caching import LRUCache, normalize_text
+from .db import get_raw_session
+from .embedding_backends import EmbeddingBackend, get_embedding_backend
+from .entities import EmbeddingCacheEntry
+
+memory_cache = LRUCache(settings.EMBEDDING_CACHE_SIZE)
+query_cache = LRUCache(
+    settings.QUERY_EMBEDDING_CACHE_SIZE, ttl=settings.QUERY_EMBEDDING_CACHE_TTL
+)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf8")).hexdigest()
+
+
+def _load_from_db(
+    backend: EmbeddingBackend, hashes: list[str]
+) -> dict[str, list[float]]:
+    with get_raw_session() as session:
+        entries = session.exec(
+            select(EmbeddingCacheEntry).where(
+                EmbeddingCacheEntry.text_hash.in_(hashes),
+                EmbeddingCacheEntry.model == backend.name,
+                EmbeddingCacheEntry.dimensions == backend.dimensions,
+            )
+        ).all()
+        return {
+            entry.text_hash: [float(value) for value in entry.embedding]
+            for entry in entries
+        }
+
+
+def _save_to_db(backend: EmbeddingBackend, embeddings: dict[str, list[float]]) -> None:
+    stmt = insert(EmbeddingCacheEntry).values(
+        [
+            {
+                "text_hash": hash_,
+                "model": backend.name,
+                "dimensions": backend.dimensions,
+                "embedding": embedding,
+            }
+            for hash_, embedding in embeddings.items()
+        ]
+    )
+    with get_raw_session() as session:
+        session.exec(stmt.on_conflict_do_nothing())
+        session.commit()
+
+
+async def get_cached_embeddings(texts: list[str]) -> list[list[float]]:
+    """
+    Zwraca embeddingi tekstów w tej samej kolejności, pytając API tylko
+    o teksty, których nie ma ani w pamięci procesu, ani w tabeli
+    embedding_cache. Klucz zawiera też nazwę i wymiar backendu. Teksty są
+    porównywane po znormalizowanym hashu, więc powtórzenia (także w obrębie
+    jednego wywołania) trafiają do API raz.
+    """
+    backend = get_embedding_backend()
+    hashes = [text_hash(text) for text in texts]
+    found: dict[str, list[float]] = {}
+    missing: dict[str, str] = {}
+
+    for hash_, text in zip(hashes, texts):
+        if hash_ in found or hash_ in missing:
+            continue
+        embedding = memory_cache.get((hash_, backend.name, backend.dimensions))
+        if embedding is None:
+            missing[hash_] = normalize_text(text)
+        else:
+            found[hash_] = embedding
+
+    if missing:
+        from_db = await asyncio.to_thread(_load_from_db, backend, list(missing))
+        found.update(from_db)
+        for hash_ in from_db:
+            del missing[hash_]
+
+    if missing:
+        embeddings = await backend.aembed(list(missing.values()))
+        fetched = dict(zip(missing, embeddings))
+        await asyncio.to_thread(_save_to_db, backend, fetched)
+        found.update(fetched)
+
+    for hash_, embedding in found.items():
+        memory_cache.set((hash_, backend.name, backend.dimensions), embedding)
+
+    return [found[hash_] for hash_ in hashes]
+
+
+def get_query_embedding(query: str) -> list[float]:
+    """Embedding zapytania wyszukiwania, współdzielony przez endpointy search."""
+    backend = get_embedding_backend()
+    key = (normalize_text(query), backend.name, backend.dimensions)
+    embedding = query_cache.get(key)
+    if embedding is None:
+        embedding = backend.embed([query])[0]
+        query_cache.set(key, embedding)
+    return embedding
+
+
+async def aget_query_embedding(query: str) -> list[float]:
+    """Jak get_query_embedding, ale bez blokowania pętli zdarzeń."""
+    backend = get_embedding_backend()
+    key = (normalize_text(query), backend.name, backend.dimensions)
+    embedding = query_cache.get(key)
+    if embedding is None:
+        embedding = (await backend.aembed([query]))[0]
+        query_cache.set(key, embedding)
+    return embedding
@@ -0,0 +1,216 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from typing import Optional
+
+import httpx
+from google import genai
+from google.genai import errors
+from google.genai.types import EmbedContentConfig
+
+from ..config import settings
+from .googleapi import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+BAD_INPUT_STATUS_CODES = {400, 413, 422}
+
+
+class TokenBucket:
+    """
+    Limiter zapytań wspólny dla wszystkich wątków i pętli zdarzeń.
+
+    reserve() od razu rezerwuje token (saldo może zejść poniżej zera)
+    i zwraca, ile trzeba odczekać, więc kolejni chętni ustawiają się w kolejce
+    zamiast budzić się naraz.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AdaptiveBatchSize:
+    """
+    Rozmiar paczki sterowany AIMD: rośnie o 1 po udanym zapytaniu, spada
+    o połowę po 429 albo zbyt dużym zapytaniu.
+    """
+
+    def __init__(self, maximum: int):
+        self.maximum = maximum
+        self._value = maximum
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def increase(self) -> None:
+        with self._lock:
+            self._value = min(self.maximum, self._value + 1)
+
+    def decrease(self) -> None:
+        with self._lock:
+            self._value = max(1, self._value // 2)
+
+
+rate_limiter = TokenBucket(
+    settings.EMBEDDING_REQUESTS_PER_MINUTE / 60, settings.EMBEDDING_BURST
+)
+adaptive_batch_size = AdaptiveBatchSize(settings.EMBEDDING_BATCH_SIZE)
+
+
+def _field_violations(error: errors.APIError) -> set[str]:
+    details = error.details if isinstance(error.details, dict) else {}
+    details = details.get("error", details)
+    return {
+        violation.get("field", "")
+        for detail in details.get("details", [])
+        if isinstance(detail, dict)
+        for violation in detail.get("fieldViolations", [])
+    }
+
+
+def _is_too_large(error: Exception) -> bool:
+    # 413 albo 400 INVALID_ARGUMENT wskazujące na listę zapytań paczki
+    # (BadRequest.fieldViolations), a nie na jej treść czy konfigurację
+    if not isinstance(error, errors.APIError):
+        return False
+    if error.code == 413:
+        return True
+    return (
+        error.code == 400
+        and error.status == "INVALID_ARGUMENT"
+        and any(field.startswith("requests") for field in _field_violations(error))
+    )
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+def is_bad_input(error: Exception) -> bool:
+    """Błąd odrzucający treść zapytania - ponowienie go nie naprawi."""
+    return isinstance(error, errors.APIError) and error.code in BAD_INPUT_STATUS_CODES
+
+
+class AsyncEmbeddingClient:
+    """
+    Asynchroniczny klient embeddingów: jedno połączenie HTTP (pula klienta
+    genai) na pętlę zdarzeń, limit zapytań z TokenBucket, adaptacyjny rozmiar
+    paczek i ponawianie 429/5xx z wykładniczym backoffem.
+    """
+
+    def __init__(
+        self,
+        client: Optional[genai.Client] = None,
+        limiter: TokenBucket = rate_limiter,
+        batch_size: AdaptiveBatchSize = adaptive_batch_size,
+        max_concurrency: int = settings.EMBEDDING_MAX_CONCURRENCY,
+        max_retries: int = settings.EMBEDDING_MAX_RETRIES,
+        backoff_base: float = settings.EMBEDDING_BACKOFF_BASE,
+        backoff_max: float = settings.EMBEDDING_BACKOFF_MAX,
+    ):
+        self.client = client or genai.Client(api_key=settings.GOOGLE_AI_STUDIO_API_KEY)
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Zwraca embeddingi w kolejności texts, dzieląc je na paczki."""
+        return await self._embed_chunks(texts, self.batch_size.value)
+
+    async def _embed_chunks(
+        self, texts: list[str], size: int, attempt: int = 0
+    ) -> list[list[float]]:
+        batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+        results = await asyncio.gather(
+            *(self._embed_batch(batch, attempt) for batch in batches)
+        )
+        return [embedding for result in results for embedding in result]
+
+    async def _backoff(self, attempt: int) -> None:
+        delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+        await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def _embed_batch(
+        self, texts: list[str], attempt: int = 0
+    ) -> list[list[float]]:
+        while True:
+            try:
+                async with self._semaphore:
+                    await self.limiter.acquire()
+                    response = await self.client.aio.models.embed_content(
+                        model=EMBEDDING_MODEL,
+                        contents=texts,
+                        config=EmbedContentConfig(
+                            task_type="RETRIEVAL_QUERY",
+                            output_dimensionality=EMBEDDING_DIMENSIONS,
+                        ),
+                    )
+            except Exception as e:
+                if _is_too_large(e) and len(texts) > 1:
+                    # zapytanie za duże - dzielimy paczkę na pół zamiast ponawiać
+                    self.batch_size.decrease()
+                    return await self._embed_chunks(
+                        texts, (len(texts) + 1) // 2, attempt
+                    )
+
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                await self._backoff(attempt)
+                attempt += 1
+
+                if isinstance(e, errors.APIError) and e.code == 429:
+                    self.batch_size.decrease()
+                    if len(texts) > self.batch_size.value:
+                        # ponawiamy już w paczkach nowego rozmiaru
+                        return await self._embed_chunks(
+                            texts, self.batch_size.value, attempt
+                        )
+                continue
+
+            self.batch_size.increase()
+            return [embedding.values for embedding in response.embeddings]
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_embedding_client() -> AsyncEmbeddingClient:
+    """
+    Klient dla bieżącej pętli zdarzeń - połączenia httpx nie mogą być
+    współdzielone między pętlami, ale limiter i rozmiar paczek są wspólne.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncEmbeddingClient()
+        _clients[loop] = client
+    return client
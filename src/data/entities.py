@@ -1,9 +1,12 @@
 import datetime
 from typing import Any
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
 from sqlmodel import Field, Relationship, SQLModel
 from enum import Enum
 
+from ..config import settings
+from .vectors import SEARCH_DIMENSIONS
+
 
 class ConversationStatus(str, Enum):
     pending = "pending"
@@ -39,10 +42,32 @@ class Utterance(SQLModel, table=True):
     start_time: float = Field()
     end_time: float = Field()
     text: str = Field()
-    embedding: Any | None = Field(default=None, sa_type=Vector(3072))
+    embedding: Any | None = Field(
+        default=None, sa_type=Vector(settings.EMBEDDING_DIMENSIONS)
+    )
+    search_embedding: Any | None = Field(
+        default=None, sa_type=HALFVEC(SEARCH_DIMENSIONS)
+    )
+    binary_embedding: str | None = Field(
+        default=None, sa_type=BIT(settings.EMBEDDING_DIMENSIONS)
+    )
+    # nieudane próby pobrania embeddingu przez utterances_periodic_worker
+    embedding_attempts: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     speaker_id: int | None = Field(default=None, foreign_key="speaker.id")
     speaker: Speaker | None = Relationship(back_populates="utterances")
 
     conversation_id: int = Field(foreign_key="conversation.id")
     conversation: Conversation = Relationship(back_populates="utterances")
+
+
+class EmbeddingCacheEntry(SQLModel, table=True):
+    __tablename__ = "embedding_cache"
+
+    text_hash: str = Field(primary_key=True)
+    model: str = Field(primary_key=True)
+    dimensions: int = Field(primary_key=True)
+    embedding: Any = Field(sa_type=Vector())
+    created_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
+    )
@@ -1,18 +1,27 @@
+from functools import cache
+
 from google import genai
 from google.genai.types import EmbedContentConfig, EmbedContentResponse
 
 from ..config import settings
 
-client = genai.Client(api_key=settings.GOOGLE_AI_STUDIO_API_KEY)
+EMBEDDING_MODEL = "gemini-embedding-exp-03-07"
+EMBEDDING_DIMENSIONS = settings.EMBEDDING_DIMENSIONS
+
+
+@cache
+def get_client() -> genai.Client:
+    # tworzony przy pierwszym użyciu - inne backendy embeddingów nie potrzebują klucza
+    return genai.Client(api_key=settings.GOOGLE_AI_STUDIO_API_KEY)
 
 
 def get_embeddings(content) -> EmbedContentResponse:
-    response = client.models.embed_content(
-        model="gemini-embedding-exp-03-07",
+    response = get_client().models.embed_content(
+        model=EMBEDDING_MODEL,
         contents=content,
         config=EmbedContentConfig(
             task_type="RETRIEVAL_QUERY",
-            output_dimensionality=3072,
+            output_dimensionality=EMBEDDING_DIMENSIONS,
         ),
     )
     return response
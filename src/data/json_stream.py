@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+from typing import BinaryIO, Iterator, Optional
+
+import ijson
+
+# powyżej tego rozmiaru upload jest przenoszony z pamięci na dysk
+SPOOL_MAX_SIZE = 1024 * 1024
+
+SEGMENT_FIELDS = ("start", "end", "text")
+WORD_FIELDS = ("start", "end", "word")
+
+
+def spool_upload(source: BinaryIO) -> tempfile.SpooledTemporaryFile:
+    """
+    Kopiuje upload kawałkami do własnego pliku tymczasowego, który przeżyje
+    zamknięcie UploadFile po zakończeniu requestu.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    shutil.copyfileobj(source, spool)
+    spool.seek(0)
+    return spool
+
+
+def iter_speaker_turns(
+    file: BinaryIO, diff_time: Optional[int] = None
+) -> Iterator[list]:
+    """Zwraca kolejne trójki [start, end, speaker] z pliku diaryzacji."""
+    for s_start, s_end, speaker in ijson.items(file, "item", use_float=True):
+        if diff_time:
+            s_start += diff_time
+            s_end += diff_time
+        yield [s_start, s_end, speaker]
+
+
+def iter_whisper_segments(
+    file: BinaryIO, diff_time: Optional[int] = None, words: bool = False
+) -> Iterator[dict]:
+    """
+    Zwraca segmenty Whispera z samymi polami start/end/text, a przy
+    words=True także z listą "words" (start/end/word każdego słowa) dla
+    get_segments(split_by_words=True).
+
+    Pozostałe pola (tokens, avg_logprob, ...) oraz pełny "text" transkrypcji
+    są tylko przewijane przez parser i nigdy nie trafiają do pamięci.
+    """
+    segment = None
+    word = None
+    for prefix, event, value in ijson.parse(file, use_float=True):
+        if prefix == "segments.item":
+            if event == "start_map":
+                segment = {}
+            elif event == "end_map":
+                if diff_time:
+                    segment["start"] += diff_time
+                    segment["end"] += diff_time
+                    for item in segment.get("words", ()):
+                        item["start"] += diff_time
+                        item["end"] += diff_time
+                yield segment
+                segment = None
+        elif segment is None or not prefix.startswith("segments.item."):
+            continue
+        elif not prefix.startswith("segments.item.words"):
+            field = prefix[len("segments.item.") :]
+            if field in SEGMENT_FIELDS:
+                segment[field] = value
+        elif words:
+            if prefix == "segments.item.words" and event == "start_array":
+                segment["words"] = []
+            elif prefix == "segments.item.words.item":
+                if event == "start_map":
+                    word = {}
+                elif event == "end_map":
+                    segment["words"].append(word)
+                    word = None
+            elif word is not None:
+                field = prefix[len("segments.item.words.item.") :]
+                if field in WORD_FIELDS:
+                    word[field] = value
@@ -0,0 +1,341 @@
+import datetime
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlmodel import Session, select
+
+from ..config import settings
+from .entities import Conversation, Utterance
+from .vectors import SEARCH_DIMENSIONS
+
+SOURCES = {
+    "compact": (Utterance.search_embedding, SEARCH_DIMENSIONS),
+    "full": (Utterance.embedding, settings.EMBEDDING_DIMENSIONS),
+}
+
+# wiersze mnożone naraz - float16 jest zamieniany na float32 paczkami,
+# żeby nie kopiować całej macierzy przy każdym zapytaniu
+CHUNK_ROWS = 4096
+LOAD_BATCH_SIZE = 1000
+
+
+def _as_array(vector) -> np.ndarray:
+    # Vector z pgvector wraca jako ndarray, HALFVEC jako HalfVector
+    if hasattr(vector, "to_numpy"):
+        vector = vector.to_numpy()
+    return np.asarray(vector, dtype=np.float32)
+
+
+def _normalized(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class MemoryVectorIndex:
+    """
+    Znormalizowane wektory wypowiedzi w jednej ciągłej macierzy w pamięci
+    procesu, obok tablice id, mówcy, rozmowy i daty rozmowy do filtrów.
+    Ranking to iloczyn skalarny z zapytaniem (odległość kosinusowa) i
+    argpartition - bez sieci i planera. Postgres pozostaje źródłem danych:
+    indeks jest wczytywany z bazy i odświeżany z niej po zmianach rozmów,
+    a zwrócone id wyszukiwanie i tak czyta z bazy.
+
+    Indeksowane są tylko wypowiedzi z embeddingiem i mówcą, tak jak
+    w similarity_search. Usunięty wiersz zastępuje ostatni, więc macierz nie
+    ma dziur.
+    """
+
+    def __init__(self, source: str = "compact", dtype: str = "float16"):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown memory index source: {source}")
+        self.source = source
+        self.column, self.dimensions = SOURCES[source]
+        self.dtype = np.dtype(dtype)
+        self.ready = False
+
+        self._lock = threading.RLock()
+        self._dirty: set[int] = set()
+        self._dirty_utterances: set[int] = set()
+        self._dirty_event = threading.Event()
+        self._positions: dict[int, int] = {}
+        self._size = 0
+        self._allocate(0)
+
+    def _allocate(self, capacity: int) -> None:
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._speakers = np.zeros(capacity, dtype=np.int64)
+        self._conversations = np.zeros(capacity, dtype=np.int64)
+        self._dates = np.full(capacity, np.datetime64("NaT"), dtype="datetime64[D]")
+        self._vectors = np.zeros((capacity, self.dimensions), dtype=self.dtype)
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= len(self._ids):
+            return
+        old = (
+            self._ids,
+            self._speakers,
+            self._conversations,
+            self._dates,
+            self._vectors,
+        )
+        self._allocate(max(capacity, 2 * len(self._ids)))
+        new = (
+            self._ids,
+            self._speakers,
+            self._conversations,
+            self._dates,
+            self._vectors,
+        )
+        for source, target in zip(old, new):
+            target[: self._size] = source[: self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def rows_stmt(self):
+        """Wiersze indeksu: id, mówca, rozmowa, data rozmowy i wektor."""
+        return (
+            select(
+                Utterance.id,
+                Utterance.speaker_id,
+                Utterance.conversation_id,
+                Conversation.conversation_date,
+                self.column,
+            )
+            .join(Conversation)
+            .where(self.column != None)
+            .where(Utterance.speaker_id != None)
+        )
+
+    def upsert(self, rows: Iterable[tuple]) -> None:
+        """Dodaje albo nadpisuje wiersze (id, mówca, rozmowa, data, wektor)."""
+        rows = list(rows)
+        if not rows:
+            return
+        ids, speakers, conversations, dates, vectors = zip(*rows)
+        matrix = np.stack([_as_array(vector)[: self.dimensions] for vector in vectors])
+        matrix = _normalized(matrix).astype(self.dtype)
+        dates = np.array(dates, dtype="datetime64[D]")
+
+        with self._lock:
+            added = sum(
+                1 for utterance_id in ids if utterance_id not in self._positions
+            )
+            self._reserve(self._size + added)
+            positions = np.empty(len(ids), dtype=np.int64)
+            for i, utterance_id in enumerate(ids):
+                position = self._positions.get(utterance_id)
+                if position is None:
+                    position = self._positions[utterance_id] = self._size
+                    self._size += 1
+                positions[i] = position
+
+            self._ids[positions] = ids
+            self._speakers[positions] = speakers
+            self._conversations[positions] = conversations
+            self._dates[positions] = dates
+            self._vectors[positions] = matrix
+
+    def remove(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            for utterance_id in ids:
+                position = self._positions.pop(utterance_id, None)
+                if position is None:
+                    continue
+                last = self._size - 1
+                if position != last:
+                    for array in (
+                        self._ids,
+                        self._speakers,
+                        self._conversations,
+                        self._dates,
+                        self._vectors,
+                    ):
+                        array[position] = array[last]
+                    self._positions[int(self._ids[position])] = position
+                self._size = last
+
+    def _conversation_ids(self, conversation_ids: Iterable[int]) -> list[int]:
+        size = self._size
+        selected = np.isin(self._conversations[:size], list(conversation_ids))
+        return self._ids[:size][selected].tolist()
+
+    def replace_conversations(
+        self, conversation_ids: Iterable[int], rows: Iterable[tuple]
+    ) -> None:
+        """Podmienia wszystkie wiersze rozmów naraz - wyszukiwanie nie widzi
+        stanu pośredniego."""
+        with self._lock:
+            self.remove(self._conversation_ids(conversation_ids))
+            self.upsert(rows)
+
+    def load(
+        self, session: Session, stop_event: Optional[threading.Event] = None
+    ) -> bool:
+        """
+        Wczytuje cały indeks z bazy, paczkami przez kursor po stronie serwera.
+        Ustawiony stop_event przerywa wczytywanie między paczkami - indeks
+        zostaje wtedy bez zmian i zwracane jest False.
+        """
+        result = session.exec(
+            self.rows_stmt()
+            .order_by(Utterance.id)
+            .execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        loaded = MemoryVectorIndex(self.source, self.dtype.name)
+        for batch in result.partitions():
+            if stop_event is not None and stop_event.is_set():
+                result.close()
+                return False
+            loaded.upsert(batch)
+
+        with self._lock:
+            (
+                self._ids,
+                self._speakers,
+                self._conversations,
+                self._dates,
+                self._vectors,
+            ) = (
+                loaded._ids,
+                loaded._speakers,
+                loaded._conversations,
+                loaded._dates,
+                loaded._vectors,
+            )
+            self._positions = loaded._positions
+            self._size = loaded._size
+            self.ready = True
+        return True
+
+    def refresh_conversations(
+        self, session: Session, conversation_ids: Iterable[int]
+    ) -> None:
+        conversation_ids = list(conversation_ids)
+        rows = session.exec(
+            self.rows_stmt().where(Utterance.conversation_id.in_(conversation_ids))
+        ).all()
+        self.replace_conversations(conversation_ids, rows)
+
+    def refresh_utterances(
+        self, session: Session, utterance_ids: Iterable[int]
+    ) -> None:
+        """Dopisuje albo nadpisuje tylko podane wypowiedzi, np. nowe embeddingi."""
+        rows = session.exec(
+            self.rows_stmt().where(Utterance.id.in_(list(utterance_ids)))
+        ).all()
+        self.upsert(rows)
+
+    def conversations_of(self, utterance_ids: Iterable[int]) -> set[int]:
+        """Rozmowy zaindeksowanych wypowiedzi; id spoza indeksu są pomijane."""
+        with self._lock:
+            positions = [
+                self._positions[utterance_id]
+                for utterance_id in utterance_ids
+                if utterance_id in self._positions
+            ]
+            return set(self._conversations[positions].tolist())
+
+    def mark_dirty(
+        self,
+        conversation_ids: Iterable[int],
+        utterance_ids: Optional[Iterable[int]] = None,
+    ) -> None:
+        """
+        Zmiany do odświeżenia z bazy przez worker indeksu: podane wypowiedzi
+        albo, bez utterance_ids, całe rozmowy (edycje i usunięcia).
+        """
+        with self._lock:
+            if utterance_ids is None:
+                self._dirty.update(conversation_ids)
+            else:
+                self._dirty_utterances.update(utterance_ids)
+        self._dirty_event.set()
+
+    def wait_dirty(self, timeout: Optional[float] = None) -> tuple[set[int], set[int]]:
+        """Zwraca i zeruje (rozmowy, wypowiedzi) oznaczone przez mark_dirty."""
+        self._dirty_event.wait(timeout)
+        with self._lock:
+            self._dirty_event.clear()
+            dirty, self._dirty = self._dirty, set()
+            dirty_utterances, self._dirty_utterances = self._dirty_utterances, set()
+        return dirty, dirty_utterances
+
+    def _scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        count = self._size if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, count)
+            if rows is None:
+                block = self._vectors[start:end]
+            else:
+                block = self._vectors[rows[start:end]]
+            np.matmul(
+                block.astype(np.float32, copy=False), query, out=scores[start:end]
+            )
+        return scores
+
+    def search(
+        self,
+        query_embedding,
+        limit: int,
+        speaker_id: Optional[int] = None,
+        conversation_id: Optional[int] = None,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+    ) -> list[int]:
+        """
+        Id najbliższych wypowiedzi od najbardziej podobnej. Filtry to maski na
+        tablicach obok macierzy; przy filtrach mnożone są tylko pasujące
+        wiersze. Rozmowy bez daty nie przechodzą filtrów dat, jak w SQL.
+        """
+        query = _normalized(_as_array(query_embedding)[: self.dimensions])
+
+        with self._lock:
+            size = self._size
+            conditions = []
+            if speaker_id is not None:
+                conditions.append(self._speakers[:size] == speaker_id)
+            if conversation_id is not None:
+                conditions.append(self._conversations[:size] == conversation_id)
+            if start_date is not None:
+                conditions.append(self._dates[:size] >= np.datetime64(start_date, "D"))
+            if end_date is not None:
+                conditions.append(self._dates[:size] <= np.datetime64(end_date, "D"))
+
+            rows = None
+            if conditions:
+                rows = np.flatnonzero(np.logical_and.reduce(conditions))
+            scores = self._scores(query, rows)
+
+            limit = min(limit, len(scores))
+            if limit <= 0:
+                return []
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            if rows is not None:
+                top = rows[top]
+            return self._ids[top].tolist()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "source": self.source,
+                "dtype": self.dtype.name,
+                "size": self._size,
+                "capacity": len(self._ids),
+                "bytes": self._vectors.nbytes
+                + self._ids.nbytes
+                + self._speakers.nbytes
+                + self._conversations.nbytes
+                + self._dates.nbytes,
+                "pending_conversations": len(self._dirty),
+                "pending_utterances": len(self._dirty_utterances),
+            }
+
+
+memory_index = MemoryVectorIndex(
+    settings.VECTOR_MEMORY_INDEX_SOURCE, settings.VECTOR_MEMORY_INDEX_DTYPE
+)
@@ -0,0 +1,34 @@
+import base64
+import json
+
+from sqlmodel import tuple_
+
+from .entities import Utterance
+
+
+def encode_cursor(start_time: float, id: int) -> str:
+    """Nieprzezroczysty kursor wskazujący ostatnią zwróconą wypowiedź."""
+    payload = json.dumps([start_time, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        start_time, id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(start_time), int(id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_page(stmt, after: str | None):
+    """
+    Kolejność (start_time, id) i - przy podanym kursorze - tylko wypowiedzi
+    po nim. Porównanie krotek korzysta z indeksu i nie zależy od numeru strony,
+    więc każda strona kosztuje tyle samo.
+    """
+    stmt = stmt.order_by(Utterance.start_time, Utterance.id)
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(Utterance.start_time, Utterance.id) > tuple_(*decode_cursor(after))
+        )
+    return stmt
@@ -1,3 +1,7 @@
+import bisect
+import heapq
+
+
 def seconds_to_time(seconds):
     """Convert seconds to a formatted time string."""
     hours = int(seconds // 3600)
@@ -54,7 +58,52 @@ def estimate_duration_from_text(text, method="words", wpm=150):
         raise ValueError("Method must be 'words' or 'chars'")
 
 
+def _best_match(w_start, w_end, matches):
+    best_overlap = 0
+    best_speaker = "UNKNOWN"
+
+    for spk_start, spk_end, spk, overlap in matches:
+        overlap = calculate_overlap_score(w_start, w_end, spk_start, spk_end)
+        duration = w_end - w_start
+        if duration > 0:
+            overlap_ratio = overlap / duration
+            if overlap_ratio > best_overlap:
+                best_overlap = overlap_ratio
+                best_speaker = spk
+
+    return best_overlap, best_speaker
+
+
+def _label_segment(w_start, w_end, w_text, matches, min_overlap_ratio, verbose):
+    segment_data = {"start": w_start, "end": w_end, "text": w_text}
+
+    if len(matches) == 1:
+        segment_data["speaker"] = matches[0][2]
+        segment_data["method"] = "exact"
+    elif len(matches) > 1:
+        segment_data["method"] = "multiple"
+        best_overlap, best_speaker = _best_match(w_start, w_end, matches)
+
+        if best_overlap >= min_overlap_ratio:
+            segment_data["speaker"] = best_speaker
+        else:
+            if verbose:
+                print(
+                    f"Warning: Low overlap ({best_overlap:.2f}) for segment [{w_start:.2f} - {w_end:.2f}]."
+                )
+            segment_data["speaker"] = "UNKNOWN"
+    else:
+        segment_data["method"] = "none"
+        segment_data["speaker"] = "UNKNOWN"
+
+    return segment_data
+
+
 def combine_segments(speaker_data, whisper_data, min_overlap_ratio=0.25, verbose=False):
+    """
+    Implementacja referencyjna O(N*M) - dla każdego segmentu Whispera przegląda
+    wszystkie tury mówców. Używana w testach do weryfikacji combine_segments_sweep.
+    """
     combined_segments = []
     no_speaker = 0
     filtered_by_duration = 0
@@ -64,8 +113,6 @@ def combine_segments(speaker_data, whisper_data, min_overlap_ratio=0.25, verbose
         w_end = segment["end"]
         w_text = segment["text"].strip()
 
-        segment_data = {"start": w_start, "end": w_end, "text": w_text}
-
         matches = []
         estimated_duration = estimate_duration_from_text(w_text)
         for s_start, s_end, speaker in speaker_data:
@@ -76,35 +123,9 @@ def combine_segments(speaker_data, whisper_data, min_overlap_ratio=0.25, verbose
             if overlap > 0:
                 matches.append((s_start, s_end, speaker, overlap))
 
-        if len(matches) == 1:
-            segment_data["speaker"] = matches[0][2]
-            segment_data["method"] = "exact"
-        elif len(matches) > 1:
-            segment_data["method"] = "multiple"
-            best_overlap = 0
-            best_speaker = "UNKNOWN"
-
-            for spk_start, spk_end, spk, overlap in matches:
-                overlap = calculate_overlap_score(w_start, w_end, spk_start, spk_end)
-                duration = w_end - w_start
-                if duration > 0:
-                    overlap_ratio = overlap / duration
-                    if overlap_ratio > best_overlap:
-                        best_overlap = overlap_ratio
-                        best_speaker = spk
-
-            if best_overlap >= min_overlap_ratio:
-                segment_data["speaker"] = best_speaker
-            else:
-                if verbose:
-                    print(
-                        f"Warning: Low overlap ({best_overlap:.2f}) for segment [{w_start:.2f} - {w_end:.2f}]."
-                    )
-                segment_data["speaker"] = "UNKNOWN"
-        else:
-            segment_data["method"] = "none"
-            segment_data["speaker"] = "UNKNOWN"
-
+        segment_data = _label_segment(
+            w_start, w_end, w_text, matches, min_overlap_ratio, verbose
+        )
         combined_segments.append(segment_data)
 
         if segment_data["speaker"] == "UNKNOWN":
@@ -114,6 +135,234 @@ def combine_segments(speaker_data, whisper_data, min_overlap_ratio=0.25, verbose
     return combined_segments, no_speaker
 
 
+def _sweep_overlapping_turns(speaker_data, intervals):
+    """
+    Dla każdego przedziału (start, end) zwraca jego indeks i listę tur
+    (index, s_start, s_end, speaker), które mogą na niego nachodzić.
+
+    Tury mówców są sortowane po początku, a przedziały przetwarzane
+    w kolejności startu. Kopiec aktywnych tur (kluczowany końcem) trzyma tylko
+    tury, które zaczęły się przed przedziałem i jeszcze trwają; tury zaczynające
+    się wewnątrz przedziału znajduje bisect. Kandydaci są sortowani po indeksie
+    w speaker_data, żeby remisy rozstrzygały się tak samo jak w wersji
+    referencyjnej.
+    """
+    turns = sorted(
+        (s_start, index, s_end, speaker)
+        for index, (s_start, s_end, speaker) in enumerate(speaker_data)
+    )
+    turn_starts = [turn[0] for turn in turns]
+    order = sorted(range(len(intervals)), key=lambda i: intervals[i][0])
+
+    active = []
+    next_turn = 0
+
+    for interval_index in order:
+        start, end = intervals[interval_index]
+
+        while next_turn < len(turns) and turns[next_turn][0] < start:
+            s_start, index, s_end, speaker = turns[next_turn]
+            heapq.heappush(active, (s_end, index, s_start, speaker))
+            next_turn += 1
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+
+        candidates = [
+            (index, s_start, s_end, speaker)
+            for s_end, index, s_start, speaker in active
+        ]
+        inside_end = bisect.bisect_left(turn_starts, end, lo=next_turn)
+        candidates.extend(
+            (index, s_start, s_end, speaker)
+            for s_start, index, s_end, speaker in turns[next_turn:inside_end]
+        )
+        candidates.sort()
+
+        yield interval_index, candidates
+
+
+def _sweep_matches(speaker_data, whisper_data):
+    """
+    Zwraca (indeks, start, end, tekst, dopasowania) dla każdego segmentu
+    Whispera, z tymi samymi dopasowaniami co pętla w combine_segments.
+    """
+    segments = whisper_data["segments"]
+    intervals = [(segment["start"], segment["end"]) for segment in segments]
+
+    for segment_index, candidates in _sweep_overlapping_turns(speaker_data, intervals):
+        segment = segments[segment_index]
+        w_start = segment["start"]
+        w_end = segment["end"]
+        w_text = segment["text"].strip()
+
+        matches = []
+        estimated_duration = estimate_duration_from_text(w_text)
+        for _, s_start, s_end, speaker in candidates:
+            if estimated_duration / 2 > (s_end - s_start):
+                continue
+            overlap = calculate_overlap(w_start, w_end, s_start, s_end)
+            if overlap > 0:
+                matches.append((s_start, s_end, speaker, overlap))
+
+        yield segment_index, w_start, w_end, w_text, matches
+
+
+def combine_segments_sweep(
+    speaker_data, whisper_data, min_overlap_ratio=0.25, verbose=False
+):
+    """
+    Ten sam wynik co combine_segments, ale w czasie O((N+M) log M)
+    - kandydatów dla każdego segmentu wyznacza _sweep_overlapping_turns.
+    """
+    combined_segments = [None] * len(whisper_data["segments"])
+    no_speaker = 0
+
+    for segment_index, w_start, w_end, w_text, matches in _sweep_matches(
+        speaker_data, whisper_data
+    ):
+        segment_data = _label_segment(
+            w_start, w_end, w_text, matches, min_overlap_ratio, verbose
+        )
+        combined_segments[segment_index] = segment_data
+
+        if segment_data["speaker"] == "UNKNOWN":
+            no_speaker += 1
+
+    return combined_segments, no_speaker
+
+
+def unknown_speaker_rates(speaker_data, whisper_data, thresholds):
+    """
+    Liczba i odsetek segmentów bez mówcy dla każdego min_overlap_ratio
+    z thresholds, wyznaczone z jednego przebiegu dopasowania.
+
+    Próg wpływa tylko na segmenty "multiple" - wystarczy raz policzyć ich
+    najlepszy wynik, a potem dla każdego progu policzyć bisectem wyniki
+    poniżej niego.
+    """
+    segment_count = len(whisper_data["segments"])
+    always_unknown = 0
+    scores = []
+
+    for _, w_start, w_end, _, matches in _sweep_matches(speaker_data, whisper_data):
+        if not matches:
+            always_unknown += 1
+        elif len(matches) > 1:
+            best_overlap, _ = _best_match(w_start, w_end, matches)
+            if best_overlap > 0:
+                scores.append(best_overlap)
+            else:
+                always_unknown += 1
+
+    scores.sort()
+
+    rates = []
+    for min_overlap_ratio in thresholds:
+        no_speaker = always_unknown + bisect.bisect_left(scores, min_overlap_ratio)
+        rates.append(
+            {
+                "min_overlap_ratio": min_overlap_ratio,
+                "no_speaker": no_speaker,
+                "unknown_rate": no_speaker / segment_count if segment_count else 0.0,
+            }
+        )
+    return rates
+
+
+def _split_segment_by_words(segment, segment_data, words, word_speakers):
+    """
+    Dzieli segment na ciągłe fragmenty tego samego mówcy. Słowa bez tury
+    przejmują mówcę poprzedniego słowa (lub następnego, jeśli są na początku).
+    """
+    known = [speaker for speaker in word_speakers if speaker is not None]
+    if not known:
+        return [segment_data]
+
+    current = known[0]
+    runs = []
+    for word, speaker in zip(words, word_speakers):
+        if speaker is not None:
+            current = speaker
+        if runs and runs[-1][0] == current:
+            runs[-1][1].append(word)
+        else:
+            runs.append((current, [word]))
+
+    if len(runs) == 1:
+        return [{**segment_data, "speaker": runs[0][0], "method": "words"}]
+
+    parts = []
+    for i, (speaker, run_words) in enumerate(runs):
+        parts.append(
+            {
+                "start": segment["start"] if i == 0 else run_words[0]["start"],
+                "end": segment["end"] if i == len(runs) - 1 else run_words[-1]["end"],
+                "text": "".join(word["word"] for word in run_words).strip(),
+                "speaker": speaker,
+                "method": "words",
+            }
+        )
+    return parts
+
+
+def combine_segments_by_words(
+    speaker_data, whisper_data, min_overlap_ratio=0.25, verbose=False
+):
+    """
+    Jak combine_segments_sweep, ale segmenty "multiple" z czasami słów
+    (whisper z word_timestamps=True) są dzielone na granicach tur mówców.
+
+    Każde słowo dostaje turę o największym nakładaniu; słowa i tury są łączone
+    tym samym przebiegiem co segmenty, więc koszt to O((W+M) log M) zamiast
+    skanowania słowa x tury.
+    """
+    combined_segments, _ = combine_segments_sweep(
+        speaker_data, whisper_data, min_overlap_ratio, verbose
+    )
+    segments = whisper_data["segments"]
+
+    words = []
+    for segment_index, segment in enumerate(segments):
+        if combined_segments[segment_index]["method"] != "multiple":
+            continue
+        for word in segment.get("words") or []:
+            words.append((segment_index, word))
+
+    word_speakers = [None] * len(words)
+    intervals = [(word["start"], word["end"]) for _, word in words]
+    for word_index, candidates in _sweep_overlapping_turns(speaker_data, intervals):
+        w_start, w_end = intervals[word_index]
+        best_overlap = 0
+        for _, s_start, s_end, speaker in candidates:
+            overlap = calculate_overlap(w_start, w_end, s_start, s_end)
+            if overlap > best_overlap:
+                best_overlap = overlap
+                word_speakers[word_index] = speaker
+
+    words_by_segment = {}
+    for (segment_index, word), speaker in zip(words, word_speakers):
+        segment_words = words_by_segment.setdefault(segment_index, ([], []))
+        segment_words[0].append(word)
+        segment_words[1].append(speaker)
+
+    split_segments = []
+    no_speaker = 0
+    for segment_index, segment_data in enumerate(combined_segments):
+        if segment_index in words_by_segment:
+            parts = _split_segment_by_words(
+                segments[segment_index],
+                segment_data,
+                *words_by_segment[segment_index],
+            )
+        else:
+            parts = [segment_data]
+
+        split_segments.extend(parts)
+        no_speaker += sum(1 for part in parts if part["speaker"] == "UNKNOWN")
+
+    return split_segments, no_speaker
+
+
 def print_combined_segments(segments):
     for segment in segments:
         start = segment["start"]
@@ -135,19 +384,14 @@ def save_combined_segments_as_srt(segments, file_path):
             )
 
 
+DEFAULT_THRESHOLDS = [round(step * 0.01, 2) for step in range(51)]
+
+
 def test_different_settings(speaker_data, whisper_data):
-    min_overlap_ratio = 0.0
-    while min_overlap_ratio <= 0.5:
-        combined_segments, no_speaker = combine_segments(
-            speaker_data,
-            whisper_data,
-            min_overlap_ratio=min_overlap_ratio,
-            verbose=False,
-        )
-        min_overlap_ratio += 0.01
-        print(f"\nStatistics for min overlap ratio {min_overlap_ratio:.2f}s:")
+    for rate in unknown_speaker_rates(speaker_data, whisper_data, DEFAULT_THRESHOLDS):
+        print(f"\nStatistics for min overlap ratio {rate['min_overlap_ratio']:.2f}:")
         print(
-            f"Percentage of segments with no speaker: {no_speaker / len(whisper_data['segments']) * 100:.2f}%"
+            f"Percentage of segments with no speaker: {rate['unknown_rate'] * 100:.2f}%"
         )
 
 
@@ -158,16 +402,20 @@ def change_speaker_name(segments, old_name, new_name):
     return segments
 
 
+def numerate_speaker(speaker):
+    if speaker == "UNKNOWN":
+        return -1
+    return int(speaker.split("_")[-1])
+
+
 def numerate_speakers(segments):
     for i, segment in enumerate(segments):
-        if segment["speaker"] == "UNKNOWN":
-            segment["speaker"] = -1
-        else:
-            segment["speaker"] = int(segment["speaker"].split("_")[-1])
+        segment["speaker"] = numerate_speaker(segment["speaker"])
 
 
-def get_segments(speaker_data, whisper_data):
-    combined_segments, no_speaker = combine_segments(
+def get_segments(speaker_data, whisper_data, split_by_words=False):
+    combine = combine_segments_by_words if split_by_words else combine_segments_sweep
+    combined_segments, no_speaker = combine(
         speaker_data, whisper_data, min_overlap_ratio=0.05, verbose=False
     )
 
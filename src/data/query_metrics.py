@@ -0,0 +1,184 @@
+import bisect
+import re
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# górne granice kubełków w milisekundach, ostatni kubełek to "więcej"
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"%\(\w+\)s|\$\d+|%s|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str, max_length: int = 1000) -> str:
+    """
+    Postać zapytania bez wartości: literały i parametry zamienione na ?,
+    listy IN zwinięte do jednego elementu, białe znaki ujednolicone.
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PARAMETER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return normalized[:max_length]
+
+
+class LatencyHistogram:
+    """Histogram czasów w stałych kubełkach LATENCY_BUCKETS_MS."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Górna granica kubełka, w którym leży dany percentyl."""
+        if self.count == 0:
+            return None
+        threshold = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= threshold:
+                return min(float(bound), self.max_ms)
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(LATENCY_BUCKETS_MS, self.counts)
+                },
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class QueryMetrics:
+    """
+    Histogramy czasów zapytań według fingerprint. Liczba różnych zapytań jest
+    ograniczona - nadmiarowe trafiają do wspólnego wpisu OTHER.
+    """
+
+    OTHER = "<other>"
+
+    def __init__(self, max_statements: int = 500):
+        self.max_statements = max_statements
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, statement: str, elapsed_ms: float) -> None:
+        key = fingerprint(statement)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                if len(self._histograms) >= self.max_statements:
+                    key = self.OTHER
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+            histogram.observe(elapsed_ms)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> list[dict]:
+        """Zapytania od największego łącznego czasu."""
+        with self._lock:
+            rows = [
+                {"statement": key, **histogram.snapshot()}
+                for key, histogram in self._histograms.items()
+            ]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+query_metrics = QueryMetrics()
+
+
+def instrument_engine(engine, metrics: QueryMetrics = query_metrics) -> None:
+    """Mierzy czas wykonania każdego zapytania silnika (także AsyncEngine)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            metrics.observe(statement, (time.perf_counter() - started) * 1000)
+
+
+class _WaitCountingPool:
+    """
+    Domieszka do puli liczącej połączenia, na które ktoś właśnie czeka,
+    i histogram czasu oczekiwania na połączenie.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkout_wait = LatencyHistogram()
+        self._wait_lock = threading.Lock()
+
+    def _do_get(self):
+        with self._wait_lock:
+            self.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            with self._wait_lock:
+                self.waiting -= 1
+                self.checkout_wait.observe((time.perf_counter() - started) * 1000)
+
+    def recreate(self):
+        # pre_ping i unieważnienie puli tworzą nową pulę - liczniki zostają
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+        return pool
+
+
+class InstrumentedQueuePool(_WaitCountingPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitCountingPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(engine) -> dict:
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, _WaitCountingPool):
+        stats["waiting"] = pool.waiting
+        stats["checkout_wait"] = pool.checkout_wait.snapshot()
+    return stats
@@ -0,0 +1,94 @@
+import threading
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from ..config import settings
+from .caching import LRUCache, normalize_text
+
+
+class SearchCache:
+    """
+    Cache wyników wyszukiwania unieważniany licznikami wersji.
+
+    Klucz zawiera wersję rozmowy (dla zapytań z conversation_id) albo wersję
+    globalną, którą podbija każda zmiana. Klucz trzeba wyliczyć przed
+    zapytaniem do bazy - wynik policzony na danych sprzed zmiany trafi wtedy
+    pod starą wersję i nie zostanie już odczytany. Stare wpisy wypadają
+    przez LRU i TTL. Liczniki są w pamięci procesu, więc przy kilku procesach
+    API każdy unieważnia tylko własny cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(maxsize, ttl=ttl)
+        self._versions: dict[int, int] = {}
+        self._global_version = 0
+        self._generation = 0
+        self._listeners: list[
+            Callable[[Iterable[int], Optional[Iterable[int]]], None]
+        ] = []
+        self._lock = threading.Lock()
+
+    def key(self, kind: str, query: str, conversation_id: Optional[int], **params):
+        with self._lock:
+            if conversation_id is None:
+                version = self._global_version
+            else:
+                version = self._versions.get(conversation_id, 0)
+            generation = self._generation
+        return (
+            kind,
+            normalize_text(query),
+            conversation_id,
+            generation,
+            version,
+            tuple(sorted(params.items())),
+        )
+
+    def get(self, key: Hashable) -> Any:
+        return self._cache.get(key)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._cache.set(key, value)
+
+    def subscribe(
+        self, listener: Callable[[Iterable[int], Optional[Iterable[int]]], None]
+    ) -> None:
+        """
+        listener dostaje id rozmów i id wypowiedzi z każdego
+        invalidate_conversation; None zamiast id wypowiedzi oznacza, że
+        rozmowy mogły zmienić się w całości.
+        """
+        self._listeners.append(listener)
+
+    def invalidate_conversation(
+        self,
+        *conversation_ids: int,
+        utterance_ids: Optional[Iterable[int]] = None,
+        notify: bool = True,
+    ) -> None:
+        """
+        utterance_ids zawęża zmianę do podanych wypowiedzi (np. nowych
+        embeddingów) - tylko dla słuchaczy, wersje rozmów rosną tak samo.
+        """
+        with self._lock:
+            for conversation_id in conversation_ids:
+                self._versions[conversation_id] = (
+                    self._versions.get(conversation_id, 0) + 1
+                )
+            self._global_version += 1
+        if notify:
+            if utterance_ids is not None:
+                utterance_ids = list(utterance_ids)
+            for listener in self._listeners:
+                listener(conversation_ids, utterance_ids)
+
+    def clear(self) -> None:
+        """Dla zmian widocznych we wszystkich wynikach, np. danych mówcy."""
+        with self._lock:
+            self._generation += 1
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+search_cache = SearchCache(settings.SEARCH_CACHE_SIZE, ttl=settings.SEARCH_CACHE_TTL)
@@ -0,0 +1,139 @@
+from collections import deque
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from .process_data import (
+    _label_segment,
+    calculate_overlap,
+    estimate_duration_from_text,
+    numerate_speaker,
+)
+
+
+class StreamingAligner:
+    """
+    Przyrostowe dopasowanie segmentów Whispera do tur mówców.
+
+    Oba strumienie muszą być posortowane po czasie początku. Segment jest
+    gotowy, gdy strumień tur minął jego koniec (kolejna tura zaczyna się
+    nie wcześniej niż koniec segmentu) albo gdy tury się skończyły.
+    W pamięci zostają tylko oczekujące segmenty i tury, które mogą jeszcze
+    nachodzić na któryś z nich.
+    """
+
+    def __init__(self, min_overlap_ratio=0.05):
+        self.min_overlap_ratio = min_overlap_ratio
+        self._turns = []
+        self._pending = deque()
+        self._last_turn_start = float("-inf")
+        self._last_segment_start = float("-inf")
+        self._turns_closed = False
+
+    @property
+    def buffered(self) -> int:
+        return len(self._turns) + len(self._pending)
+
+    def add_turn(self, turn):
+        s_start, s_end, speaker = turn
+        if s_start < self._last_turn_start:
+            raise ValueError("Speaker turns must be sorted by start time")
+        self._last_turn_start = s_start
+        self._turns.append((s_start, s_end, speaker))
+
+    def add_segment(self, segment):
+        if segment["start"] < self._last_segment_start:
+            raise ValueError("Whisper segments must be sorted by start time")
+        self._last_segment_start = segment["start"]
+        self._pending.append(segment)
+
+    def close_turns(self):
+        self._turns_closed = True
+
+    def _is_ready(self, segment) -> bool:
+        return self._turns_closed or self._last_turn_start >= segment["end"]
+
+    def needs_turns(self) -> bool:
+        return bool(self._pending) and not self._is_ready(self._pending[0])
+
+    def ready(self) -> Iterator[dict]:
+        while self._pending and self._is_ready(self._pending[0]):
+            yield self._label(self._pending.popleft())
+        self._prune_turns()
+
+    def _label(self, segment) -> dict:
+        w_start = segment["start"]
+        w_end = segment["end"]
+        w_text = segment["text"].strip()
+
+        matches = []
+        estimated_duration = estimate_duration_from_text(w_text)
+        for s_start, s_end, speaker in self._turns:
+            if estimated_duration / 2 > (s_end - s_start):
+                continue
+            overlap = calculate_overlap(w_start, w_end, s_start, s_end)
+            if overlap > 0:
+                matches.append((s_start, s_end, speaker, overlap))
+
+        return _label_segment(
+            w_start, w_end, w_text, matches, self.min_overlap_ratio, False
+        )
+
+    def _prune_turns(self):
+        # kolejne segmenty nie zaczną się wcześniej niż ten próg
+        if self._pending:
+            horizon = self._pending[0]["start"]
+        else:
+            horizon = self._last_segment_start
+        self._turns = [turn for turn in self._turns if turn[1] > horizon]
+
+
+def _numerated(segment: dict) -> dict:
+    segment["speaker"] = numerate_speaker(segment["speaker"])
+    return segment
+
+
+def stream_segments(
+    speaker_turns: Iterable, whisper_segments: Iterable[dict], min_overlap_ratio=0.05
+) -> Iterator[dict]:
+    """Strumieniowy odpowiednik get_segments dla iteratorów synchronicznych."""
+    aligner = StreamingAligner(min_overlap_ratio)
+    turns = iter(speaker_turns)
+
+    for segment in whisper_segments:
+        aligner.add_segment(segment)
+        while aligner.needs_turns():
+            turn = next(turns, None)
+            if turn is None:
+                aligner.close_turns()
+            else:
+                aligner.add_turn(turn)
+        for ready_segment in aligner.ready():
+            yield _numerated(ready_segment)
+
+    aligner.close_turns()
+    for ready_segment in aligner.ready():
+        yield _numerated(ready_segment)
+
+
+async def astream_segments(
+    speaker_turns: AsyncIterable,
+    whisper_segments: AsyncIterable[dict],
+    min_overlap_ratio=0.05,
+) -> AsyncIterator[dict]:
+    """Strumieniowy odpowiednik get_segments dla iteratorów asynchronicznych."""
+    aligner = StreamingAligner(min_overlap_ratio)
+    turns = aiter(speaker_turns)
+
+    async for segment in whisper_segments:
+        aligner.add_segment(segment)
+        while aligner.needs_turns():
+            turn = await anext(turns, None)
+            if turn is None:
+                aligner.close_turns()
+            else:
+                aligner.add_turn(turn)
+        for ready_segment in aligner.ready():
+            yield _numerated(ready_segment)
+
+    aligner.close_turns()
+    for ready_segment in aligner.ready():
+        yield _numerated(ready_segment)
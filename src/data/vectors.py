@@ -0,0 +1,39 @@
+import math
+
+from ..config import settings
+
+# kompaktowa kopia nie może być dłuższa niż pełny wektor
+SEARCH_DIMENSIONS = min(
+    settings.SEARCH_EMBEDDING_DIMENSIONS, settings.EMBEDDING_DIMENSIONS
+)
+
+
+def compact_embedding(embedding, dimensions: int = SEARCH_DIMENSIONS) -> list[float]:
+    """
+    Obcina embedding do pierwszych dimensions wymiarów (Matryoshka) i ponownie
+    normalizuje, żeby odległość kosinusowa na krótszym wektorze miała sens.
+    Zapisywany jako halfvec służy do pierwszego etapu wyszukiwania.
+    """
+    truncated = [float(value) for value in embedding[:dimensions]]
+    norm = math.sqrt(sum(value * value for value in truncated))
+    if norm == 0:
+        return truncated
+    return [value / norm for value in truncated]
+
+
+def binary_quantize(embedding) -> str:
+    """
+    Bit znaku każdego wymiaru (jak binary_quantize w pgvector), jako napis
+    dla kolumny bit(n) - 384 bajty zamiast 12 KB dla 3072 wymiarów.
+    """
+    return "".join("1" if value > 0 else "0" for value in embedding)
+
+
+def derived_embeddings(embedding) -> dict:
+    """Kolumny wyszukiwania wyliczane z pełnego embeddingu wypowiedzi."""
+    if embedding is None:
+        return {"search_embedding": None, "binary_embedding": None}
+    return {
+        "search_embedding": compact_embedding(embedding),
+        "binary_embedding": binary_quantize(embedding),
+    }
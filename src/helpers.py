@@ -1,18 +1,24 @@
 import asyncio
 from datetime import date
 import json
-from typing import List, Optional
+from typing import BinaryIO, List, Optional
 from fastapi import HTTPException, UploadFile
 from sqlmodel import select
 
+from src.config import settings
 from src.data.db import Conversation, Speaker, Utterance
 from src.data.entities import ConversationStatus
-from src.data.googleapi import get_embeddings
+from src.data.embedding_cache import get_cached_embeddings
+from src.data.json_stream import iter_speaker_turns, iter_whisper_segments
 from src.data.process_data import get_segments
+from src.data.search_cache import search_cache
+from src.data.vectors import derived_embeddings
 from src.services.transcription import TranscriptionService
 from .typedefs import SessionDep
 
-from src.workers.conversations_periodic_worker import process_and_save_utterances_without_speakers
+from src.workers.conversations_periodic_worker import (
+    process_and_save_utterances_without_speakers,
+)
 
 
 async def load_json(upload_file: UploadFile):
@@ -29,12 +35,9 @@ def create_conversation(
     status: Optional[ConversationStatus] = None,
     youtube_url: Optional[str] = None,
 ) -> Conversation:
-   
     if youtube_url and status is None:
         status = ConversationStatus.pending
 
-    
-
     conversation = Conversation(
         title=name.strip(),
         description=description.strip() if description else None,
@@ -56,6 +59,7 @@ async def process_and_save_utterances(
     speaker_data: dict,
     whisper_data: dict,
     limit: Optional[int] = None,
+    split_by_words: bool = settings.WORD_LEVEL_ALIGNMENT,
 ) -> None:
     speakers_in_db = session.exec(select(Speaker).where(Speaker.id.in_(speakers))).all()
     if len(speakers_in_db) != len(set(speakers)):
@@ -66,40 +70,39 @@ async def process_and_save_utterances(
             detail=f"Speaker(s) with the following ID(s) were not found: {missing_ids}",
         )
 
-    segments = get_segments(speaker_data, whisper_data)
+    segments = get_segments(speaker_data, whisper_data, split_by_words=split_by_words)
     if limit:
         segments = segments[:limit]
 
-    semaphore = asyncio.Semaphore(20)
-
-    async def process_segment(segment):
-        async with semaphore:
-            embedding = await asyncio.to_thread(get_embeddings, [segment["text"]])
-
-            speaker_id = None
-            speaker_index = segment.get("speaker", -1)
-            if speaker_index != -1 and speaker_index < len(speakers):
-                speaker_id = speakers[speaker_index]
-
-            return Utterance(
+    try:
+        embeddings = await get_cached_embeddings(
+            [segment["text"] for segment in segments]
+        )
+    except Exception as e:
+        # wypowiedzi bez embeddingu uzupełni utterances_periodic_worker
+        print(f"Error embedding segments: {e}")
+        embeddings = [None] * len(segments)
+
+    for segment, embedding in zip(segments, embeddings):
+        speaker_id = None
+        speaker_index = segment.get("speaker", -1)
+        if speaker_index != -1 and speaker_index < len(speakers):
+            speaker_id = speakers[speaker_index]
+
+        session.add(
+            Utterance(
                 start_time=segment["start"],
                 end_time=segment["end"],
                 text=segment["text"],
-                embedding=embedding.embeddings[0].values,
+                embedding=embedding,
+                **derived_embeddings(embedding),
                 conversation_id=conversation.id,
                 speaker_id=speaker_id,
             )
-
-    tasks = [process_segment(segment) for segment in segments]
-    utterances = await asyncio.gather(*tasks, return_exceptions=True)
-    for utterance in utterances:
-        if isinstance(utterance, Utterance):
-            session.add(utterance)
-        else:
-            # Handle exceptions that occurred during processing
-            print(f"Error processing segment: {utterance}")
+        )
 
     session.commit()
+    search_cache.invalidate_conversation(conversation.id)
 
 
 async def create_conversation_from_audio(
@@ -136,14 +139,15 @@ async def create_conversation_from_audio(
 
 async def create_conversation_from_text(
     session: SessionDep,
-    speaker_data_bytes: bytes,
-    whisper_data_bytes: bytes,
+    speaker_file: BinaryIO,
+    whisper_file: BinaryIO,
     name: str,
     speakers: List[int],
     description: Optional[str] = None,
     youtube_id: Optional[str] = None,
     conversation_date: Optional[date] = None,
     diff_time: Optional[int] = None,
+    split_by_words: bool = settings.WORD_LEVEL_ALIGNMENT,
 ):
     conversation = create_conversation(
         session=session,
@@ -152,19 +156,20 @@ async def create_conversation_from_text(
         youtube_id=youtube_id,
         conversation_date=conversation_date,
         status=ConversationStatus.completed,
-        youtube_url=f"https://www.youtube.com/watch?v={youtube_id}" if youtube_id else None,
+        youtube_url=f"https://www.youtube.com/watch?v={youtube_id}"
+        if youtube_id
+        else None,
     )
 
-    speaker_data = json.loads(speaker_data_bytes.decode("utf8"))
-    whisper_data = json.loads(whisper_data_bytes.decode("utf8"))
-
-    if diff_time:
-        for i in range(len(speaker_data)):
-            speaker_data[i][0] += diff_time
-            speaker_data[i][1] += diff_time
-        for segment in whisper_data["segments"]:
-            segment["start"] += diff_time
-            segment["end"] += diff_time
+    try:
+        speaker_data = list(iter_speaker_turns(speaker_file, diff_time))
+        whisper_segments = list(
+            iter_whisper_segments(whisper_file, diff_time, words=split_by_words)
+        )
+        whisper_data = {"segments": whisper_segments}
+    finally:
+        speaker_file.close()
+        whisper_file.close()
 
     # await process_and_save_utterances(
     #     session=session,
@@ -180,6 +185,7 @@ async def create_conversation_from_text(
         conversation=conversation,
         speaker_data=speaker_data,
         whisper_data=whisper_data,
+        split_by_words=split_by_words,
     )
 
     return conversation
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Optional
 from datetime import date
 from src.data.db import Conversation, Speaker
 from src.data.entities import ConversationStatus
@@ -17,6 +17,54 @@ class UtteranceDTO(BaseModel):
     speaker: Optional[Speaker] = None
 
 
+class UtteranceRead(BaseModel):
+    """Wypowiedź bez embeddingów i bez zagnieżdżonych encji."""
+
+    id: int
+    start_time: float
+    end_time: float
+    text: str
+    speaker_id: Optional[int] = None
+    conversation_id: int
+
+
+UTTERANCE_FIELDS = tuple(UtteranceRead.model_fields)
+
+
+class CompactUtterancesResponse(BaseModel):
+    """
+    Wiersze odwołują się do rozmów i mówców przez id, a każda encja
+    występuje raz w conversations albo speakers.
+    """
+
+    utterances: list[dict[str, Any]]
+    conversations: list[Conversation] = []
+    speakers: list[Speaker] = []
+
+    @classmethod
+    def from_utterances(
+        cls, utterances, fields: tuple[str, ...] = UTTERANCE_FIELDS
+    ) -> "CompactUtterancesResponse":
+        conversations = {}
+        speakers = {}
+        for utterance in utterances:
+            if "conversation_id" in fields:
+                conversations.setdefault(
+                    utterance.conversation_id, utterance.conversation
+                )
+            if "speaker_id" in fields and utterance.speaker is not None:
+                speakers.setdefault(utterance.speaker_id, utterance.speaker)
+
+        return cls(
+            utterances=[
+                {field: getattr(utterance, field) for field in fields}
+                for utterance in utterances
+            ],
+            conversations=list(conversations.values()),
+            speakers=list(speakers.values()),
+        )
+
+
 class UtteranceUpdateRequest(BaseModel):
     start_time: Optional[float] = None
     end_time: Optional[float] = None
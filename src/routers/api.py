@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
-from . import conversations, speakers, utterances
+from . import conversations, metrics, speakers, utterances
 
 router = APIRouter(prefix="/api", tags=["API"])
 
 router.include_router(conversations.router)
 router.include_router(speakers.router)
 router.include_router(utterances.router)
+router.include_router(metrics.router)
@@ -1,7 +1,18 @@
+import asyncio
+import json
 from datetime import date
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Form, HTTPException, UploadFile
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Form,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
 
 from sqlmodel import and_, delete, select
 
@@ -12,30 +23,85 @@ from ..helpers import (
 )
 
 from ..models.dto import (
+    UTTERANCE_FIELDS,
+    CompactUtterancesResponse,
     ConversationCreateRequest,
     ConversationUpdateRequest,
     UtteranceDTO,
 )
-from ..data.googleapi import get_embeddings
+from ..config import settings
+from ..data.embedding_cache import aget_query_embedding
+from ..data.json_stream import spool_upload
+from ..data.pagination import decode_cursor, encode_cursor, keyset_page
+from ..data.search_cache import search_cache
 
 from ..data.db import (
+    UTTERANCE_LISTING_OPTIONS,
     Conversation,
     Speaker,
     Utterance,
-    full_text_search,
-    similarity_search,
+    afull_text_search,
+    ahybrid_search,
+    ahybrid_text_ranking,
+    asimilarity_search,
+    get_async_raw_session,
 )
-from ..typedefs import SessionDep
+from ..typedefs import AsyncSessionDep, SessionDep
 
 router = APIRouter(prefix="/conversations", tags=["Conversations"])
 
+UtterancesResponse = list[UtteranceDTO] | CompactUtterancesResponse
+
+STREAM_BATCH_SIZE = 500
+
+
+def _parse_fields(fields: Optional[str]) -> tuple[str, ...]:
+    if fields is None:
+        return UTTERANCE_FIELDS
+
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = set(selected) - set(UTTERANCE_FIELDS)
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Available: {', '.join(UTTERANCE_FIELDS)}",
+        )
+    return selected
+
+
+def _utterances_response(utterances, compact: bool, fields: Optional[str]):
+    """
+    Pełne UtteranceDTO albo - przy compact lub podanym fields - wiersze
+    z wybranymi polami (np. fields=id,text,speaker_id) i tabelami rozmów
+    i mówców, do których się odwołują.
+    """
+    if not compact and fields is None:
+        return [
+            UtteranceDTO(
+                id=u.id,
+                start_time=u.start_time,
+                end_time=u.end_time,
+                text=u.text,
+                speaker_id=u.speaker_id,
+                conversation_id=u.conversation_id,
+                conversation=u.conversation,
+                speaker=u.speaker,
+                speaker_surname=u.speaker.surname if u.speaker else None,
+            )
+            for u in utterances
+        ]
+
+    return CompactUtterancesResponse.from_utterances(utterances, _parse_fields(fields))
+
 
 @router.get("/")
-async def get_conversations(session: SessionDep) -> list[Conversation]:
+async def get_conversations(session: AsyncSessionDep) -> list[Conversation]:
     stmt = select(Conversation)
-    conversations = session.exec(stmt).all()
+    conversations = (await session.exec(stmt)).all()
     return conversations
 
+
 @router.post("/")
 async def add_conversation(
     session: SessionDep,
@@ -54,17 +120,19 @@ async def add_conversation(
 
 
 @router.get("/{id}/speakers")
-async def get_speakers(id: int, session: SessionDep) -> List[Speaker]:
-    conversation = session.get(Conversation, id)
+async def get_speakers(id: int, session: AsyncSessionDep) -> List[Speaker]:
+    conversation = await session.get(Conversation, id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    speakers = session.exec(
-        select(Speaker).where(
-            Speaker.id.in_(
-                select(Utterance.speaker_id)
-                .where(Utterance.conversation_id == conversation.id)
-                .distinct()
+    speakers = (
+        await session.exec(
+            select(Speaker).where(
+                Speaker.id.in_(
+                    select(Utterance.speaker_id)
+                    .where(Utterance.conversation_id == conversation.id)
+                    .distinct()
+                )
             )
         )
     ).all()
@@ -72,72 +140,154 @@ async def get_speakers(id: int, session: SessionDep) -> List[Speaker]:
     return speakers
 
 
-@router.get("/{id}/utterances")
+async def _stream_utterances(
+    conversation: Conversation,
+    speaker_id: Optional[int],
+    after: Optional[str],
+    compact: bool,
+    fields: Optional[str],
+):
+    """
+    Wypowiedzi jako NDJSON, czytane kursorem po stronie serwera partiami
+    po STREAM_BATCH_SIZE - pamięć nie zależy od długości rozmowy. Wiersze
+    compact odwołują się do mówców przez id, pełne zawierają mówcę i rozmowę.
+    """
+    selected = _parse_fields(fields) if compact or fields is not None else None
+    stmt = keyset_page(
+        select(*(getattr(Utterance, field) for field in UTTERANCE_FIELDS)).where(
+            Utterance.conversation_id == conversation.id
+        ),
+        after,
+    )
+    if speaker_id is not None:
+        stmt = stmt.where(Utterance.speaker_id == speaker_id)
+
+    # sesja zależności jest zamykana przed wysłaniem treści odpowiedzi
+    async with get_async_raw_session() as session:
+        speakers = {}
+        if selected is None:
+            speakers = {
+                speaker.id: speaker
+                for speaker in (
+                    await session.exec(
+                        select(Speaker).where(
+                            Speaker.id.in_(
+                                select(Utterance.speaker_id).where(
+                                    Utterance.conversation_id == conversation.id
+                                )
+                            )
+                        )
+                    )
+                ).all()
+            }
+
+        result = await session.stream(
+            stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            lines = []
+            for row in rows:
+                if selected is not None:
+                    row_data = {field: row._mapping[field] for field in selected}
+                    lines.append(json.dumps(row_data, separators=(",", ":")))
+                    continue
+                speaker = speakers.get(row.speaker_id)
+                lines.append(
+                    UtteranceDTO(
+                        **row._mapping,
+                        conversation=conversation,
+                        speaker=speaker,
+                        speaker_surname=speaker.surname if speaker else None,
+                    ).model_dump_json()
+                )
+            yield "\n".join(lines) + "\n"
+
+
+@router.get("/{id}/utterances", response_model=UtterancesResponse)
 async def get_utterances(
     id: int,
-    session: SessionDep,
+    session: AsyncSessionDep,
+    response: Response,
     speaker_id: Optional[int] = None,
+    compact: bool = False,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+    stream: bool = False,
 ):
-    conversation = session.get(Conversation, id)
+    """
+    Wypowiedzi w kolejności (start_time, id). Z limit zwraca jedną stronę,
+    a kursor następnej - w nagłówku X-Next-Cursor - przekazuje się jako
+    after. stream=true zwraca wszystkie wypowiedzi po after jako NDJSON.
+    """
+    conversation = await session.get(Conversation, id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    stmt = select(Utterance).where(Utterance.conversation_id == conversation.id)
+    if after is not None:
+        try:
+            decode_cursor(after)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    if stream:
+        if fields is not None:
+            _parse_fields(fields)
+        return StreamingResponse(
+            _stream_utterances(conversation, speaker_id, after, compact, fields),
+            media_type="application/x-ndjson",
+        )
+
+    stmt = keyset_page(
+        select(Utterance)
+        .where(Utterance.conversation_id == conversation.id)
+        .options(*UTTERANCE_LISTING_OPTIONS),
+        after,
+    )
 
     if speaker_id is not None:
         stmt = stmt.where(Utterance.speaker_id == speaker_id)
 
-    utterances = session.exec(stmt).all()
-
-    return [
-        UtteranceDTO(
-            id=u.id,
-            start_time=u.start_time,
-            end_time=u.end_time,
-            text=u.text,
-            speaker_id=u.speaker_id,
-            conversation_id=u.conversation_id,
-            conversation=u.conversation,
-            speaker=u.speaker,
-            speaker_surname=u.speaker.surname if u.speaker else None,
-        )
-        for u in utterances
-    ]
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    utterances = (await session.exec(stmt)).all()
+
+    if limit is not None and len(utterances) > limit:
+        utterances = utterances[:limit]
+        last = utterances[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.start_time, last.id)
+
+    return _utterances_response(utterances, compact, fields)
 
 
 @router.get(
-    "/{conversation_id}/unknown-speakers/utterances", response_model=List[UtteranceDTO]
+    "/{conversation_id}/unknown-speakers/utterances", response_model=UtterancesResponse
 )
 async def get_utterances_with_unknown_speakers(
-    session: SessionDep,
+    session: AsyncSessionDep,
     conversation_id: int,
-) -> List[UtteranceDTO]:
-    conversation = session.get(Conversation, conversation_id)
+    compact: bool = False,
+    fields: Optional[str] = None,
+):
+    conversation = await session.get(Conversation, conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    utterances = session.exec(
-        select(Utterance).where(
-            and_(
-                Utterance.conversation_id == conversation.id,
-                Utterance.speaker_id == None,
+    utterances = (
+        await session.exec(
+            select(Utterance)
+            .where(
+                and_(
+                    Utterance.conversation_id == conversation.id,
+                    Utterance.speaker_id == None,
+                )
             )
+            .options(*UTTERANCE_LISTING_OPTIONS)
         )
     ).all()
 
-    return [
-        UtteranceDTO(
-            id=u.id,
-            start_time=u.start_time,
-            end_time=u.end_time,
-            text=u.text,
-            speaker_id=u.speaker_id,
-            conversation_id=u.conversation_id,
-            conversation=u.conversation,
-            speaker=u.speaker,
-        )
-        for u in utterances
-    ]
+    return _utterances_response(utterances, compact, fields)
 
 
 # @router.post("/audio", status_code=201)
@@ -177,24 +327,27 @@ async def add_text_converstaion_to_tasks(
     description: Optional[str] = Form(None),
     youtube_id: Optional[str] = Form(None),
     conversation_date: Optional[date] = Form(None),
-    diff_time: Optional[int] = Form(None)
+    diff_time: Optional[int] = Form(None),
+    # wymaga pliku Whispera z word_timestamps=True
+    split_by_words: bool = Form(settings.WORD_LEVEL_ALIGNMENT),
 ):
-    speaker_data_bytes = await speaker_file.read()
-    whisper_data_bytes = await whisper_file.read()
-
+    # UploadFile jest zamykany po odpowiedzi, więc zadanie dostaje własne kopie
+    speaker_spool = spool_upload(speaker_file.file)
+    whisper_spool = spool_upload(whisper_file.file)
 
     background_tasks.add_task(
         run_async_task,
         create_conversation_from_text,
         session,
-        speaker_data_bytes,
-        whisper_data_bytes,
+        speaker_spool,
+        whisper_spool,
         name,
         speakers,
         description,
         youtube_id,
         conversation_date,
-        diff_time
+        diff_time,
+        split_by_words,
     )
     return {"message": "Conversation creation task has been started"}
 
@@ -203,9 +356,9 @@ async def add_text_converstaion_to_tasks(
 async def update_conversation(
     id: int,
     data: ConversationUpdateRequest,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ) -> Conversation:
-    conversation = session.get(Conversation, id)
+    conversation = await session.get(Conversation, id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
@@ -213,37 +366,56 @@ async def update_conversation(
         if value is not None:
             setattr(conversation, key, value)
 
-    session.commit()
-    session.refresh(conversation)
+    await session.commit()
+    search_cache.invalidate_conversation(id)
+    await session.refresh(conversation)
     return conversation
 
 
 @router.delete("/{id}", status_code=204)
-async def delete_conversation(id: int, session: SessionDep):
-    conversation_to_delete = session.get(Conversation, id)
+async def delete_conversation(id: int, session: AsyncSessionDep):
+    conversation_to_delete = await session.get(Conversation, id)
 
     if not conversation_to_delete:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     utterance_delete_stmt = delete(Utterance).where(Utterance.id == id)
-    session.exec(utterance_delete_stmt)
+    await session.exec(utterance_delete_stmt)
 
-    session.delete(conversation_to_delete)
-    session.commit()
+    await session.delete(conversation_to_delete)
+    await session.commit()
+    search_cache.invalidate_conversation(id)
 
 
-@router.get("/similarity-search", response_model=list[UtteranceDTO])
+@router.get("/similarity-search", response_model=UtterancesResponse)
 async def get_similarity_search(
     query: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
     limit: Optional[int] = 20,
     speaker_id: Optional[int] = None,
     conversation_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    compact: bool = False,
+    fields: Optional[str] = None,
 ):
-    query_embedding = get_embeddings([query]).embeddings[0].values
-    results = similarity_search(
+    key = search_cache.key(
+        "similarity",
+        query,
+        conversation_id,
+        limit=limit,
+        speaker_id=speaker_id,
+        start_date=start_date,
+        end_date=end_date,
+        compact=compact,
+        fields=fields,
+    )
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    query_embedding = await aget_query_embedding(query)
+    results = await asimilarity_search(
         query_embedding,
         limit,
         speaker_id,
@@ -253,34 +425,41 @@ async def get_similarity_search(
         session,
     )
 
-    return [
-        UtteranceDTO(
-            id=u.id,
-            start_time=u.start_time,
-            end_time=u.end_time,
-            text=u.text,
-            speaker_id=u.speaker_id,
-            conversation_id=u.conversation_id,
-            conversation=u.conversation,
-            speaker=u.speaker,
-            speaker_surname=u.speaker.surname if u.speaker else None,
-        )
-        for u in results
-    ]
+    response = _utterances_response(results, compact, fields)
+    search_cache.set(key, response)
+    return response
 
 
-@router.get("/full-text", response_model=list[UtteranceDTO])
+@router.get("/full-text", response_model=UtterancesResponse)
 async def get_full_text(
     query: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
     limit: Optional[int] = 20,
     language: Optional[str] = "simple",
     speaker_id: Optional[int] = None,
     conversation_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    compact: bool = False,
+    fields: Optional[str] = None,
 ):
-    results = full_text_search(
+    key = search_cache.key(
+        "full-text",
+        query,
+        conversation_id,
+        limit=limit,
+        language=language,
+        speaker_id=speaker_id,
+        start_date=start_date,
+        end_date=end_date,
+        compact=compact,
+        fields=fields,
+    )
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    results = await afull_text_search(
         query,
         limit,
         language,
@@ -291,26 +470,15 @@ async def get_full_text(
         session,
     )
 
-    return [
-        UtteranceDTO(
-            id=u.id,
-            start_time=u.start_time,
-            end_time=u.end_time,
-            text=u.text,
-            speaker_id=u.speaker_id,
-            conversation_id=u.conversation_id,
-            conversation=u.conversation,
-            speaker=u.speaker,
-            speaker_surname=u.speaker.surname if u.speaker else None,
-        )
-        for u in results
-    ]
+    response = _utterances_response(results, compact, fields)
+    search_cache.set(key, response)
+    return response
 
 
-@router.get("/hybrid-search", response_model=list[UtteranceDTO])
+@router.get("/hybrid-search", response_model=UtterancesResponse)
 async def get_hybrid_search(
     query: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
     limit: Optional[int] = 20,
     speaker_id: Optional[int] = None,
     conversation_id: Optional[int] = None,
@@ -318,6 +486,8 @@ async def get_hybrid_search(
     rrf_k: int = 60,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    compact: bool = False,
+    fields: Optional[str] = None,
 ):
     """
     Use a low rrf_k when:
@@ -339,71 +509,64 @@ async def get_hybrid_search(
         - 100: More conservative, gives more weight to lower-ranked results.
         - 1000: Extremely conservative, considers a very wide range of results.
     """
-    fetch_limit = limit * 2 if limit else 40
-
-    fts_results = full_text_search(
+    key = search_cache.key(
+        "hybrid",
         query,
-        fetch_limit,
-        language,
-        speaker_id,
         conversation_id,
-        start_date,
-        end_date,
-        session,
+        limit=limit,
+        language=language,
+        rrf_k=rrf_k,
+        speaker_id=speaker_id,
+        start_date=start_date,
+        end_date=end_date,
+        compact=compact,
+        fields=fields,
     )
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # embedding zapytania pobiera się równolegle z rankingiem pełnotekstowym,
+    # a wyszukiwanie wektorowe rusza zaraz po nim
+    embedding_task = asyncio.create_task(aget_query_embedding(query))
+    try:
+        fts_ids = await ahybrid_text_ranking(
+            query,
+            limit,
+            language,
+            speaker_id,
+            conversation_id,
+            start_date,
+            end_date,
+            session,
+        )
+    except BaseException:
+        embedding_task.cancel()
+        raise
+    query_embedding = await embedding_task
 
-    query_embedding = get_embeddings([query]).embeddings[0].values
-    sim_results = similarity_search(
+    results = await ahybrid_search(
+        query,
         query_embedding,
-        fetch_limit,
+        limit,
+        language,
+        rrf_k,
         speaker_id,
         conversation_id,
         start_date,
         end_date,
         session,
+        fts_ids=fts_ids,
     )
-    fused_scores = {}
-    results_map = {}
 
-    for rank, utterance in enumerate(fts_results):
-        results_map[utterance.id] = utterance
-        fused_scores[utterance.id] = fused_scores.get(utterance.id, 0) + 1 / (
-            rrf_k + rank
-        )
-
-    for rank, utterance in enumerate(sim_results):
-        results_map[utterance.id] = utterance
-        fused_scores[utterance.id] = fused_scores.get(utterance.id, 0) + 1 / (
-            rrf_k + rank
-        )
-
-    sorted_ids = sorted(
-        fused_scores.keys(), key=lambda id: fused_scores[id], reverse=True
-    )
-
-    final_results = [results_map[id] for id in sorted_ids]
-
-    final_limited_results = final_results[:limit] if limit else final_results
-
-    return [
-        UtteranceDTO(
-            id=u.id,
-            start_time=u.start_time,
-            end_time=u.end_time,
-            text=u.text,
-            speaker_id=u.speaker_id,
-            conversation_id=u.conversation_id,
-            conversation=u.conversation,
-            speaker=u.speaker,
-            speaker_surname=u.speaker.surname if u.speaker else None,
-        )
-        for u in final_limited_results
-    ]
+    response = _utterances_response(results, compact, fields)
+    search_cache.set(key, response)
+    return response
 
 
 @router.get("/{id}")
-async def get_conversation(id: int, session: SessionDep) -> Conversation:
-    conversation = session.get(Conversation, id)
+async def get_conversation(id: int, session: AsyncSessionDep) -> Conversation:
+    conversation = await session.get(Conversation, id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
\ No newline at end of file
+    return conversation
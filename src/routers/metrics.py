@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+
+from ..data.db import async_engine, engine
+from ..data.embedding_cache import memory_cache, query_cache
+from ..data.memory_index import memory_index
+from ..data.query_metrics import pool_stats, query_metrics
+from ..data.search_cache import search_cache
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/caches")
+async def get_cache_metrics():
+    return {
+        "embeddings": memory_cache.stats(),
+        "query_embeddings": query_cache.stats(),
+        "search_results": search_cache.stats(),
+        "memory_index": memory_index.stats(),
+    }
+
+
+@router.get("/db")
+async def get_db_metrics():
+    """
+    Stan pul połączeń (wypożyczone, oczekujące, czas oczekiwania) i histogramy
+    czasów zapytań według fingerprint, od największego łącznego czasu.
+    """
+    return {
+        "pools": {"sync": pool_stats(engine), "async": pool_stats(async_engine)},
+        "queries": query_metrics.snapshot(),
+    }
+
+
+@router.delete("/db", status_code=204)
+async def reset_db_metrics():
+    query_metrics.clear()
@@ -1,36 +1,47 @@
 from fastapi import APIRouter, HTTPException
 from sqlmodel import and_, select
 
+from src.data.db import DEFER_EMBEDDINGS
 from src.data.entities import Utterance
-from src.models.dto import UtteranceUpdateRequest
-from src.typedefs import SessionDep
+from src.data.search_cache import search_cache
+from src.models.dto import UtteranceRead, UtteranceUpdateRequest
+from src.typedefs import AsyncSessionDep
 
 
 router = APIRouter(prefix="/utterances", tags=["Utterances"])
 
 
-@router.get("/{id}")
+@router.get("/{id}", response_model=list[UtteranceRead])
 async def get_utterances_by_id(
     id: int,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
-    utterances = session.exec(select(Utterance).where(Utterance.id == id)).all()
+    utterances = (
+        await session.exec(
+            select(Utterance).where(Utterance.id == id).options(*DEFER_EMBEDDINGS)
+        )
+    ).all()
 
     if not utterances:
         raise HTTPException(
             status_code=404, detail="No utterances found for this conversation"
         )
 
-    return utterances
+    # model_validate czyta tylko pola UtteranceRead, więc odroczone
+    # embeddingi nie są doczytywane
+    return [
+        UtteranceRead.model_validate(utterance, from_attributes=True)
+        for utterance in utterances
+    ]
 
 
 @router.put("/{id}")
 async def update_utterances(
     id: int,
-    session: SessionDep,
+    session: AsyncSessionDep,
     utterance_data: UtteranceUpdateRequest,
 ):
-    utterances = session.exec(select(Utterance).where(Utterance.id == id)).all()
+    utterances = (await session.exec(select(Utterance).where(Utterance.id == id))).all()
 
     if not utterances:
         raise HTTPException(
@@ -42,7 +53,10 @@ async def update_utterances(
             if value is not None:
                 setattr(utterance, key, value)
 
-    session.commit()
+    await session.commit()
+    search_cache.invalidate_conversation(
+        *{utterance.conversation_id for utterance in utterances}
+    )
 
     return {"message": "Utterances updated successfully"}
 
@@ -50,15 +64,17 @@ async def update_utterances(
 @router.put("/speaker/{speaker_id}")
 async def update_speaker_in_utterances(
     conversation_id: int,
-    session: SessionDep,
+    session: AsyncSessionDep,
     speaker_id: int,
     speaker_changed_id: int,
 ):
-    utterances = session.exec(
-        select(Utterance).where(
-            and_(
-                Utterance.conversation_id == conversation_id,
-                Utterance.speaker_id == speaker_id,
+    utterances = (
+        await session.exec(
+            select(Utterance).where(
+                and_(
+                    Utterance.conversation_id == conversation_id,
+                    Utterance.speaker_id == speaker_id,
+                )
             )
         )
     ).all()
@@ -71,6 +87,7 @@ async def update_speaker_in_utterances(
     for utterance in utterances:
         utterance.speaker_id = speaker_changed_id
 
-    session.commit()
+    await session.commit()
+    search_cache.invalidate_conversation(conversation_id)
 
     return {"message": "Speaker updated in all utterances"}
@@ -0,0 +1,219 @@
+"""
+Benchmark dopasowania segmentów Whispera do tur mówców.
+
+Uruchamia silniki z src/data/process_data.py (i wsadowy z batch_alignment,
+jeśli jest numpy) na parach z dataset/ oraz na syntetycznie powiększonych
+danych (transkrypcja powtórzona N razy z przesunięciem w czasie). Dla każdej
+konfiguracji zapisuje czas, szczytowe zużycie pamięci i odsetek segmentów bez
+mówcy do pliku JSON, który można porównać z poprzednim przebiegiem:
+
+    python -m src.scripts.benchmark_alignment --output bench.json
+    python -m src.scripts.benchmark_alignment --compare bench.json
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import time
+import tracemalloc
+from pathlib import Path
+
+from ..data.process_data import (
+    combine_segments,
+    combine_segments_sweep,
+    get_segments,
+)
+
+DATASET_DIR = Path(__file__).resolve().parent.parent.parent / "dataset"
+DATASET_NAMES = [
+    "braun_full",
+    "debata_konskie_polsat",
+    "karol_nawrocki_mentzen",
+    "mentzen-trzask",
+]
+SCALES = [1, 10, 100]
+MIN_OVERLAP_RATIO = 0.05
+# wersja referencyjna jest O(N*M), więc na większych danych trwałaby godzinami
+REFERENCE_MAX_SCALE = 1
+
+
+def load_dataset(name):
+    with open(DATASET_DIR / f"{name}_speaker_segments.json", encoding="utf8") as f:
+        speaker_data = json.load(f)
+    with open(DATASET_DIR / f"{name}_whisper_segments.json", encoding="utf8") as f:
+        whisper_data = json.load(f)
+    return speaker_data, whisper_data
+
+
+def scale_dataset(speaker_data, whisper_data, factor):
+    """Powtarza rozmowę factor razy, przesuwając każdą kopię za poprzednią."""
+    if factor == 1:
+        return speaker_data, whisper_data
+
+    duration = max(
+        max((turn[1] for turn in speaker_data), default=0),
+        max((segment["end"] for segment in whisper_data["segments"]), default=0),
+    )
+
+    scaled_speakers = []
+    scaled_segments = []
+    for copy in range(factor):
+        offset = copy * duration
+        scaled_speakers.extend(
+            [s_start + offset, s_end + offset, speaker]
+            for s_start, s_end, speaker in speaker_data
+        )
+        scaled_segments.extend(
+            {
+                "start": segment["start"] + offset,
+                "end": segment["end"] + offset,
+                "text": segment["text"],
+            }
+            for segment in whisper_data["segments"]
+        )
+
+    return scaled_speakers, {"segments": scaled_segments}
+
+
+def _unknown_from_segments(segments):
+    return sum(1 for segment in segments if segment["speaker"] in ("UNKNOWN", -1))
+
+
+def _engines():
+    engines = {
+        "get_segments": lambda s, w: _unknown_from_segments(get_segments(s, w)),
+        "combine_segments_sweep": lambda s, w: combine_segments_sweep(
+            s, w, MIN_OVERLAP_RATIO
+        )[1],
+        "combine_segments": lambda s, w: combine_segments(s, w, MIN_OVERLAP_RATIO)[1],
+    }
+
+    try:
+        from ..data.batch_alignment import combine_segments_batch
+    except ImportError:
+        pass
+    else:
+        engines["combine_segments_batch"] = lambda s, w: combine_segments_batch(
+            s, w, MIN_OVERLAP_RATIO
+        ).no_speaker
+
+    return engines
+
+
+def measure(engine, speaker_data, whisper_data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        no_speaker = engine(speaker_data, whisper_data)
+        timings.append(time.perf_counter() - started)
+
+    # osobny przebieg - tracemalloc mocno spowalnia wykonanie
+    tracemalloc.start()
+    try:
+        engine(speaker_data, whisper_data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), peak, no_speaker
+
+
+def run(datasets, scales, engines, repeat):
+    results = []
+    for name in datasets:
+        speaker_data, whisper_data = load_dataset(name)
+        for scale in scales:
+            scaled_speakers, scaled_whisper = scale_dataset(
+                speaker_data, whisper_data, scale
+            )
+            segment_count = len(scaled_whisper["segments"])
+
+            for engine_name, engine in engines.items():
+                if engine_name == "combine_segments" and scale > REFERENCE_MAX_SCALE:
+                    continue
+
+                wall_time, peak_memory, no_speaker = measure(
+                    engine, scaled_speakers, scaled_whisper, repeat
+                )
+                result = {
+                    "dataset": name,
+                    "scale": scale,
+                    "engine": engine_name,
+                    "segments": segment_count,
+                    "turns": len(scaled_speakers),
+                    "wall_time_s": wall_time,
+                    "peak_memory_bytes": peak_memory,
+                    "unknown_speaker_rate": no_speaker / segment_count
+                    if segment_count
+                    else 0.0,
+                }
+                results.append(result)
+                print(
+                    f"{name:<24} x{scale:<4} {engine_name:<24} "
+                    f"{wall_time * 1000:10.1f} ms {peak_memory / 2**20:8.1f} MiB "
+                    f"unknown {result['unknown_speaker_rate'] * 100:5.2f}%"
+                )
+
+    return results
+
+
+def compare(results, previous):
+    def key(result):
+        return result["dataset"], result["scale"], result["engine"]
+
+    previous_by_key = {key(result): result for result in previous["results"]}
+
+    print("\nComparison with previous run:")
+    for result in results:
+        before = previous_by_key.get(key(result))
+        if before is None:
+            continue
+        time_change = result["wall_time_s"] / max(before["wall_time_s"], 1e-9) - 1
+        memory_change = (
+            result["peak_memory_bytes"] / max(before["peak_memory_bytes"], 1) - 1
+        )
+        rate_change = result["unknown_speaker_rate"] - before["unknown_speaker_rate"]
+        print(
+            f"{result['dataset']:<24} x{result['scale']:<4} {result['engine']:<24} "
+            f"time {time_change * 100:+7.1f}% memory {memory_change * 100:+7.1f}% "
+            f"unknown {rate_change * 100:+6.2f}pp"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dataset", action="append", choices=DATASET_NAMES)
+    parser.add_argument("--scale", action="append", type=int)
+    parser.add_argument("--engine", action="append")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=Path("alignment_benchmark.json"))
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+
+    engines = _engines()
+    if args.engine:
+        engines = {name: engines[name] for name in args.engine}
+
+    results = run(
+        args.dataset or DATASET_NAMES, args.scale or SCALES, engines, args.repeat
+    )
+
+    report = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "min_overlap_ratio": MIN_OVERLAP_RATIO,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
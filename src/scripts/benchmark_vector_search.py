@@ -0,0 +1,119 @@
+"""
+Benchmark trybów wyszukiwania wektorowego na bazie.
+
+Zapytaniami są embeddingi losowo wybranych wypowiedzi; sama wypowiedź
+zapytania jest usuwana z wyników każdego trybu, bo znalazłby ją każdy
+i zawyżałaby recall. Wynik trybu "full"
+(dokładna odległość kosinusowa po pełnym wektorze) jest punktem odniesienia,
+a dla "compact", "binary" i "memory" liczony jest recall@k względem niego oraz czas
+zapytania. Indeks trybu "memory" jest wczytywany przed pomiarem. Wyniki
+trafiają do pliku JSON:
+
+    python -m src.scripts.benchmark_vector_search --queries 50 --limit 10
+"""
+
+import argparse
+import datetime
+import json
+import statistics
+import time
+from pathlib import Path
+
+from sqlmodel import func, select
+
+from ..config import settings
+from ..data.db import get_raw_session, similarity_search
+from ..data.entities import Utterance
+from ..data.memory_index import memory_index
+
+MODES = ["full", "compact", "binary", "memory"]
+
+
+def sample_queries(session, count):
+    return session.exec(
+        select(Utterance.id, Utterance.embedding)
+        .where(Utterance.embedding != None)
+        .order_by(func.random())
+        .limit(count)
+    ).all()
+
+
+def run(session, queries, limit, modes):
+    timings = {mode: [] for mode in modes}
+    recalls = {mode: [] for mode in modes}
+
+    for query_id, query in queries:
+        query = [float(value) for value in query]
+        exact = None
+        for mode in ["full"] + [mode for mode in modes if mode != "full"]:
+            started = time.perf_counter()
+            results = similarity_search(
+                query, limit + 1, None, None, None, None, session, mode=mode
+            )
+            elapsed = time.perf_counter() - started
+            ids = set(
+                [utterance.id for utterance in results if utterance.id != query_id][
+                    :limit
+                ]
+            )
+
+            if mode == "full":
+                exact = ids
+            if mode in timings:
+                timings[mode].append(elapsed)
+                recalls[mode].append(len(ids & exact) / max(len(exact), 1))
+
+    return [
+        {
+            "mode": mode,
+            "queries": len(timings[mode]),
+            "recall_at_k": statistics.mean(recalls[mode]) if recalls[mode] else 0.0,
+            "median_ms": statistics.median(timings[mode]) * 1000
+            if timings[mode]
+            else 0.0,
+            "max_ms": max(timings[mode], default=0.0) * 1000,
+        }
+        for mode in modes
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--mode", action="append", choices=MODES)
+    parser.add_argument(
+        "--output", type=Path, default=Path("vector_search_benchmark.json")
+    )
+    args = parser.parse_args()
+
+    with get_raw_session() as session:
+        queries = sample_queries(session, args.queries)
+        modes = args.mode or MODES
+        if "memory" in modes:
+            memory_index.load(session)
+        results = run(session, queries, args.limit, modes)
+
+    for result in results:
+        print(
+            f"{result['mode']:<8} recall@{args.limit} {result['recall_at_k']:6.3f} "
+            f"median {result['median_ms']:8.1f} ms max {result['max_ms']:8.1f} ms"
+        )
+
+    report = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "limit": args.limit,
+        "embedding_dimensions": settings.EMBEDDING_DIMENSIONS,
+        "search_embedding_dimensions": settings.SEARCH_EMBEDDING_DIMENSIONS,
+        "rerank_factor": settings.VECTOR_RERANK_FACTOR,
+        "binary_rerank_factor": settings.VECTOR_BINARY_RERANK_FACTOR,
+        "memory_index": memory_index.stats(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
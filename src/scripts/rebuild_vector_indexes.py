@@ -0,0 +1,25 @@
+"""
+Przebudowa indeksów ANN wypowiedzi z bieżącymi parametrami VECTOR_INDEX_*.
+
+Potrzebna po zmianie typu indeksu lub jego parametrów (m, ef_construction,
+lists) oraz gdy indeks IVFFlat był budowany na małej tabeli:
+
+    python -m src.scripts.rebuild_vector_indexes
+    python -m src.scripts.rebuild_vector_indexes --mode binary
+"""
+
+import argparse
+
+from ..data.db import VECTOR_INDEXES, rebuild_vector_indexes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", action="append", choices=list(VECTOR_INDEXES))
+    args = parser.parse_args()
+
+    rebuild_vector_indexes(args.mode)
+
+
+if __name__ == "__main__":
+    main()
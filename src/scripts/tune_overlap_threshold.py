@@ -0,0 +1,86 @@
+"""
+Dobór min_overlap_ratio dla get_segments na podstawie odsetka segmentów
+bez mówcy.
+
+Każda rozmowa jest dopasowywana tylko raz (unknown_speaker_rates), a rozmowy
+są rozdzielane między procesy. Wynikiem jest tabela: próg x źródło.
+
+    python -m src.scripts.tune_overlap_threshold
+    python -m src.scripts.tune_overlap_threshold --source braun_full \\
+        --source ../transkrypcje/wywiad --output thresholds.json
+"""
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from ..data.process_data import DEFAULT_THRESHOLDS, unknown_speaker_rates
+
+DATASET_DIR = Path(__file__).resolve().parent.parent.parent / "dataset"
+
+
+def _source_paths(source):
+    """
+    Przyjmuje nazwę rozmowy z dataset/ albo ścieżkę do wspólnego prefiksu
+    plików *_speaker_segments.json i *_whisper_segments.json.
+    """
+    prefix = Path(source) if "/" in source else DATASET_DIR / source
+    return (
+        prefix.with_name(f"{prefix.name}_speaker_segments.json"),
+        prefix.with_name(f"{prefix.name}_whisper_segments.json"),
+    )
+
+
+def _rates_for_source(source, thresholds):
+    speaker_path, whisper_path = _source_paths(source)
+    with open(speaker_path, encoding="utf8") as f:
+        speaker_data = json.load(f)
+    with open(whisper_path, encoding="utf8") as f:
+        whisper_data = json.load(f)
+    return unknown_speaker_rates(speaker_data, whisper_data, thresholds)
+
+
+def tune_thresholds(sources, thresholds=DEFAULT_THRESHOLDS, max_workers=None):
+    """Zwraca {źródło: [{min_overlap_ratio, no_speaker, unknown_rate}, ...]}."""
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            source: executor.submit(_rates_for_source, source, thresholds)
+            for source in sources
+        }
+        return {source: future.result() for source, future in futures.items()}
+
+
+def print_table(table):
+    sources = list(table)
+    print("ratio  " + "  ".join(f"{source[:22]:>22}" for source in sources))
+
+    for row in zip(*(table[source] for source in sources)):
+        cells = "  ".join(f"{rate['unknown_rate'] * 100:21.2f}%" for rate in row)
+        print(f"{row[0]['min_overlap_ratio']:.2f}   {cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", action="append")
+    parser.add_argument("--threshold", action="append", type=float)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    sources = args.source or sorted(
+        path.name[: -len("_speaker_segments.json")]
+        for path in DATASET_DIR.glob("*_speaker_segments.json")
+    )
+    table = tune_thresholds(
+        sources, args.threshold or DEFAULT_THRESHOLDS, max_workers=args.workers
+    )
+    print_table(table)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(table, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
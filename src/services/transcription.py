@@ -8,9 +8,13 @@ from ..config import settings
 
 
 class TranscriptionService:
-    def __init__(self, whisper_model_name: str = "turbo"):
+    def __init__(
+        self, whisper_model_name: str = "turbo", word_timestamps: bool = False
+    ):
         self._whisper_model = None
         self._whisper_model_name = whisper_model_name
+        # czasy słów są potrzebne dla get_segments(split_by_words=True)
+        self._word_timestamps = word_timestamps
 
         self._diarization_pipeline = None
 
@@ -44,7 +48,9 @@ class TranscriptionService:
                 ]
             )
 
-        transcription_result = self._whisper_model.transcribe(str(audio_path))
+        transcription_result = self._whisper_model.transcribe(
+            str(audio_path), word_timestamps=self._word_timestamps
+        )
 
         print(speaker_data)
         print(transcription_result)
@@ -52,4 +58,6 @@ class TranscriptionService:
         return (speaker_data, transcription_result)
 
 
-transcriptionService = TranscriptionService()
+transcriptionService = TranscriptionService(
+    word_timestamps=settings.WORD_LEVEL_ALIGNMENT
+)
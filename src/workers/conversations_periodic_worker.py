@@ -5,8 +5,10 @@ from threading import Event
 
 from sqlmodel import Session, select
 
+from src.config import settings
 from src.data.process_data import get_segments
 from src.data.db import get_raw_session
+from src.data.search_cache import search_cache
 
 
 from ..data.entities import Conversation, ConversationStatus, Speaker, Utterance
@@ -34,15 +36,18 @@ async def process_and_save_utterances_without_speakers(
     conversation: Conversation,
     speaker_data: dict,
     whisper_data: dict,
+    split_by_words: bool = settings.WORD_LEVEL_ALIGNMENT,
 ) -> None:
     speakers = sorted(set(entry[2] for entry in speaker_data))
 
-    speakers = list(map(lambda entry: Speaker(name=entry, surname="don't know"), speakers))
+    speakers = list(
+        map(lambda entry: Speaker(name=entry, surname="don't know"), speakers)
+    )
 
     session.add_all(speakers)
     session.commit()
 
-    segments = get_segments(speaker_data, whisper_data)
+    segments = get_segments(speaker_data, whisper_data, split_by_words=split_by_words)
 
     utterances: list[Utterance] = []
     for segment in segments:
@@ -63,6 +68,7 @@ async def process_and_save_utterances_without_speakers(
 
     session.add_all(utterances)
     session.commit()
+    search_cache.invalidate_conversation(conversation.id)
 
 
 def periodic_worker(yt_dlp: YoutubeDL, stop_event: Event):
@@ -111,6 +117,6 @@ def periodic_worker(yt_dlp: YoutubeDL, stop_event: Event):
             conversation.status = ConversationStatus.completed
             session.add(conversation)
             session.commit()
-        
+
         session.close()
         stop_event.wait(timeout=60)
@@ -0,0 +1,52 @@
+from threading import Event
+
+from sqlmodel import Session
+
+from src.data.db import get_raw_session
+from src.data.memory_index import memory_index
+from src.data.search_cache import search_cache
+
+
+def periodic_worker(stop_event: Event):
+    # zmiany zgłoszone w trakcie wczytywania zostaną odświeżone zaraz po nim
+    search_cache.subscribe(memory_index.mark_dirty)
+
+    while not stop_event.is_set() and not memory_index.ready:
+        session: Session = get_raw_session()
+        try:
+            if memory_index.load(session, stop_event):
+                print(f"Loaded {len(memory_index)} utterance vectors into memory")
+        except Exception as e:
+            print(f"Error loading memory index: {e}")
+            stop_event.wait(timeout=60)
+        finally:
+            session.close()
+
+    while not stop_event.is_set():
+        conversation_ids, utterance_ids = memory_index.wait_dirty(timeout=1)
+        if not conversation_ids and not utterance_ids:
+            continue
+
+        session: Session = get_raw_session()
+        try:
+            # najpierw pojedyncze wypowiedzi - odświeżenie całych rozmów po nich
+            # usuwa z indeksu także wiersze skasowane w międzyczasie
+            if utterance_ids:
+                memory_index.refresh_utterances(session, utterance_ids)
+            if conversation_ids:
+                memory_index.refresh_conversations(session, conversation_ids)
+            # wyniki policzone przed odświeżeniem indeksu nie mogą zostać w cache
+            search_cache.invalidate_conversation(
+                *{
+                    *conversation_ids,
+                    *memory_index.conversations_of(utterance_ids),
+                },
+                notify=False,
+            )
+        except Exception as e:
+            memory_index.mark_dirty(conversation_ids)
+            memory_index.mark_dirty((), utterance_ids)
+            print(f"Error refreshing memory index: {e}")
+            stop_event.wait(timeout=60)
+        finally:
+            session.close()
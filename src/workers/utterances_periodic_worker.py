@@ -1,28 +1,108 @@
+import asyncio
 from threading import Event
 
 from sqlmodel import Session, select
 
+from src.config import settings
 from src.data.entities import Utterance
-from src.data.googleapi import get_embeddings
+from src.data.embedding_cache import get_cached_embeddings
+from src.data.embedding_client import is_bad_input
 from src.data.db import get_raw_session
+from src.data.search_cache import search_cache
+from src.data.vectors import derived_embeddings
+
+
+async def _embed(utterances: list[Utterance]) -> None:
+    texts = [utterance.text for utterance in utterances]
+    embeddings = await get_cached_embeddings(texts)
+    for utterance, embedding in zip(utterances, embeddings):
+        utterance.embedding = embedding
+        utterance.sqlmodel_update(derived_embeddings(embedding))
+
+
+async def embed_pending_utterances(session: Session, batch_size: int) -> int:
+    """
+    Blokuje do batch_size wypowiedzi bez embeddingu (SKIP LOCKED, więc kilka
+    workerów nie weźmie tych samych wierszy), pobiera ich embeddingi (teksty
+    już znane biorąc z cache) i zapisuje je w jednej transakcji.
+
+    Gdy API odrzuci treść paczki (4xx, patrz is_bad_input), wypowiedzi są
+    ponawiane pojedynczo i tylko te, które dalej są odrzucane, dostają
+    kolejną próbę w embedding_attempts. Paczki zaczynają się od wypowiedzi
+    z najmniejszą liczbą prób, a po EMBEDDING_MAX_ATTEMPTS wypowiedź jest
+    pomijana, więc tekst odrzucany przez API nie blokuje pozostałych.
+    Pozostałe błędy (429, 5xx, sieć) klient już ponawiał, więc idą dalej od
+    razu, bez prób pojedynczo. Jeśli odrzucone zostaną wszystkie wypowiedzi
+    paczki (np. zła konfiguracja), próby nie są liczone i błąd idzie dalej.
+    """
+    stmt = (
+        select(Utterance)
+        .where(Utterance.embedding == None)
+        .where(Utterance.embedding_attempts < settings.EMBEDDING_MAX_ATTEMPTS)
+        .order_by(Utterance.embedding_attempts, Utterance.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    utterances = session.exec(stmt).all()
+    if not utterances:
+        session.rollback()
+        return 0
+
+    try:
+        await _embed(utterances)
+    except Exception as batch_error:
+        if not is_bad_input(batch_error):
+            raise
+        failed = []
+        for utterance in utterances:
+            try:
+                await _embed([utterance])
+            except Exception as e:
+                if not is_bad_input(e):
+                    raise
+                print(f"Error embedding utterance {utterance.id}: {e}")
+                failed.append(utterance)
+        if len(utterances) > 1 and len(failed) == len(utterances):
+            raise batch_error
+        for utterance in failed:
+            utterance.embedding_attempts += 1
+
+    session.add_all(utterances)
+    session.commit()
+    # wypowiedzi z embeddingiem pojawiają się w wyszukiwaniu semantycznym
+    embedded = [
+        utterance for utterance in utterances if utterance.embedding is not None
+    ]
+    if embedded:
+        # tylko nowe wiersze - indeks w pamięci nie musi czytać całych rozmów
+        search_cache.invalidate_conversation(
+            *{utterance.conversation_id for utterance in embedded},
+            utterance_ids=[utterance.id for utterance in embedded],
+        )
+    return len(utterances)
+
 
 def periodic_worker(stop_event: Event):
+    # własna pętla zdarzeń na cały czas życia wątku, żeby klient embeddingów
+    # trzymał połączenia między paczkami; tempo zapytań wyznacza jego limiter
+    loop = asyncio.new_event_loop()
+
     while not stop_event.is_set():
         session: Session = get_raw_session()
-        
-        stmt = select(Utterance).where(Utterance.embedding == None).limit(1)
-        utterance = session.exec(stmt).first()
-        if utterance:
-            try:
-                embeddings = get_embeddings(utterance).embeddings[0].values
-                print(f"Got embeddings for utterance {utterance.id}: {embeddings}")
-                utterance.embedding = embeddings
-                session.add(utterance)
-                session.commit()
-                stop_event.wait(timeout=2)
-            except Exception as e:
+
+        try:
+            embedded = loop.run_until_complete(
+                embed_pending_utterances(session, settings.EMBEDDING_BATCH_SIZE)
+            )
+            if embedded:
+                print(f"Processed embeddings for {embedded} utterances")
+            else:
                 stop_event.wait(timeout=60)
-        else:
+        except Exception as e:
+            session.rollback()
+            print(f"Error embedding utterances: {e}")
             stop_event.wait(timeout=60)
+        finally:
+            session.close()
 
-        session.close()
\ No newline at end of file
+    loop.close()
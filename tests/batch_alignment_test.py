@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from src.data.batch_alignment import (
+    _candidate_pairs,
+    apply_threshold,
+    combine_segments_batch,
+    to_segments,
+)
+from src.data.process_data import combine_segments
+
+
+# wspólne przykłady z conftest plus mówca nakładający się na dwóch innych
+# i segment poza wszystkimi turami
+@pytest.fixture
+def sample_speaker_data(sample_speaker_data):
+    return [*sample_speaker_data, (3.0, 5.0, "SPEAKER_02")]
+
+
+@pytest.fixture
+def sample_whisper_data(sample_whisper_data):
+    return {
+        "segments": [
+            *sample_whisper_data["segments"],
+            {"start": 20.0, "end": 21.0, "text": "Nobody."},
+        ]
+    }
+
+
+@pytest.mark.parametrize("ratio", [0.0, 0.05, 0.25, 0.5])
+def test_combine_segments_batch_matches_reference(
+    sample_speaker_data, sample_whisper_data, ratio
+):
+    alignment = combine_segments_batch(
+        sample_speaker_data, sample_whisper_data, min_overlap_ratio=ratio
+    )
+    expected_segments, expected_no_speaker = combine_segments(
+        sample_speaker_data, sample_whisper_data, min_overlap_ratio=ratio
+    )
+
+    assert to_segments(alignment) == expected_segments
+    assert alignment.no_speaker == expected_no_speaker
+
+
+def test_combine_segments_batch_columns(sample_speaker_data, sample_whisper_data):
+    alignment = combine_segments_batch(sample_speaker_data, sample_whisper_data)
+
+    assert alignment.segments.dtype.names == (
+        "start",
+        "end",
+        "speaker",
+        "best_speaker",
+        "score",
+        "method",
+    )
+    assert alignment.labels.tolist() == ["SPEAKER_00", "SPEAKER_01", "SPEAKER_02"]
+    assert alignment.segments["method"].tolist() == [
+        "exact",
+        "exact",
+        "multiple",
+        "exact",
+        "none",
+        "none",
+    ]
+    assert alignment.segments["speaker"][-1] == -1
+
+
+def test_combine_segments_batch_empty_inputs():
+    whisper_data = {"segments": [{"start": 0, "end": 1, "text": "a"}]}
+    alignment = combine_segments_batch([], whisper_data)
+    assert alignment.no_speaker == 1
+    assert to_segments(alignment)[0]["method"] == "none"
+
+    alignment = combine_segments_batch([(0, 1, "SPEAKER_00")], {"segments": []})
+    assert alignment.no_speaker == 0
+    assert len(alignment.segments) == 0
+
+
+def test_apply_threshold_matches_fresh_alignment(load_dataset):
+    speaker_data, whisper_data = load_dataset("mentzen-trzask")
+
+    base = combine_segments_batch(speaker_data, whisper_data, min_overlap_ratio=0.0)
+    for ratio in (0.05, 0.25, 0.5):
+        retuned = apply_threshold(base, ratio)
+        expected_segments, expected_no_speaker = combine_segments(
+            speaker_data, whisper_data, min_overlap_ratio=ratio
+        )
+
+        assert to_segments(retuned) == expected_segments
+        assert retuned.no_speaker == expected_no_speaker
+
+
+def test_candidate_pairs_stay_bounded_after_a_long_turn():
+    # jedna długa tura na początku nie może rozszerzać zakresu kolejnych
+    # segmentów na wszystkie tury przed nimi
+    turn_start = np.array([0.0] + [100.0 + i for i in range(1000)])
+    turn_end = np.array([50.0] + [100.5 + i for i in range(1000)])
+    w_start = np.array([10.0] + [100.1 + i for i in range(1000)])
+    w_end = np.array([20.0] + [100.4 + i for i in range(1000)])
+
+    seg, turn = _candidate_pairs(turn_start, turn_end, w_start, w_end)
+
+    assert sorted(zip(seg.tolist(), turn.tolist())) == [(i, i) for i in range(1001)]
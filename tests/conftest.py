@@ -0,0 +1,36 @@
+import pytest
+
+from src.scripts import benchmark_alignment
+
+
+@pytest.fixture
+def load_dataset():
+    """Zwraca funkcję wczytującą (tury mówców, dane Whispera) rozmowy z dataset/."""
+    return benchmark_alignment.load_dataset
+
+
+@pytest.fixture
+def sample_speaker_data():
+    return [
+        (0.0, 4.0, "SPEAKER_00"),
+        (4.5, 8.0, "SPEAKER_01"),
+        (8.5, 12.0, "SPEAKER_00"),
+        (12.5, 13.5, "SPEAKER_01"),
+    ]
+
+
+@pytest.fixture
+def sample_whisper_data():
+    return {
+        "segments": [
+            {"start": 1.0, "end": 3.0, "text": "This is a test."},
+            {"start": 4.1, "end": 4.4, "text": "No match."},
+            {"start": 3.8, "end": 5.2, "text": "Multiple matches here."},
+            {"start": 8.0, "end": 9.0, "text": "Low overlap"},
+            {
+                "start": 12.0,
+                "end": 14.0,
+                "text": "This is a very very very long sentence for testing duration filter.",
+            },
+        ]
+    }
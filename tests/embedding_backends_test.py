@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.data.embedding_backends import (
+    HashingEmbeddingBackend,
+    OnnxEmbeddingBackend,
+)
+
+
+def cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_backend_is_deterministic_and_normalized():
+    backend = HashingEmbeddingBackend(dimensions=64)
+
+    first, second = backend.embed(["Dziękuję bardzo.", "Dziękuję bardzo."])
+
+    assert first == second
+    assert len(first) == 64
+    assert math.isclose(math.sqrt(sum(v * v for v in first)), 1.0)
+
+
+def test_hashing_backend_places_similar_texts_closer():
+    backend = HashingEmbeddingBackend(dimensions=256)
+
+    query, similar, different = backend.embed(
+        [
+            "podatki dla firm",
+            "niższe podatki dla małych firm",
+            "pogoda jutro w Krakowie",
+        ]
+    )
+
+    assert cosine(query, similar) > cosine(query, different)
+
+
+def test_hashing_backend_handles_empty_text():
+    backend = HashingEmbeddingBackend(dimensions=8)
+
+    assert backend.embed([""]) == [[1.0, 0, 0, 0, 0, 0, 0, 0]]
+
+
+def test_onnx_backend_runs_the_model_in_batches():
+    # bez modelu - _embed_batch zastępuje tokenizer i sesję onnxruntime
+    backend = OnnxEmbeddingBackend.__new__(OnnxEmbeddingBackend)
+    backend._np = np
+    backend.batch_size = 2
+    batches = []
+
+    def embed_batch(texts):
+        batches.append(texts)
+        return np.array([[float(len(text))] for text in texts])
+
+    backend._embed_batch = embed_batch
+
+    assert backend.embed(["a", "bb", "ccc", "dddd", "e"]) == [
+        [1.0],
+        [2.0],
+        [3.0],
+        [4.0],
+        [1.0],
+    ]
+    assert batches == [["a", "bb"], ["ccc", "dddd"], ["e"]]
+    assert backend.embed([]) == []
@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.genai import errors
+
+from src.data import embedding_client
+from src.data.embedding_client import (
+    AdaptiveBatchSize,
+    AsyncEmbeddingClient,
+    TokenBucket,
+)
+
+
+def api_error(code, status="", details=()):
+    return errors.APIError(
+        code, {"error": {"code": code, "status": status, "details": list(details)}}
+    )
+
+
+TOO_MANY_REQUESTS = {
+    "@type": "type.googleapis.com/google.rpc.BadRequest",
+    "fieldViolations": [{"field": "requests", "description": "at most 4"}],
+}
+
+
+class FakeClient:
+    """Klient genai zwracający [len(text)] albo kolejne zaplanowane błędy."""
+
+    def __init__(self, failures=(), max_batch=None):
+        self.failures = list(failures)
+        self.max_batch = max_batch
+        self.calls = []
+        self.aio = SimpleNamespace(models=SimpleNamespace(embed_content=self._embed))
+
+    async def _embed(self, model, contents, config):
+        self.calls.append(list(contents))
+        if self.max_batch is not None and len(contents) > self.max_batch:
+            raise api_error(400, "INVALID_ARGUMENT", [TOO_MANY_REQUESTS])
+        if self.failures:
+            raise self.failures.pop(0)
+        return SimpleNamespace(
+            embeddings=[SimpleNamespace(values=[float(len(text))]) for text in contents]
+        )
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(embedding_client.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(embedding_client.random, "uniform", lambda a, b: 1.0)
+    return delays
+
+
+def make_client(fake, batch_size=8, max_retries=3):
+    return AsyncEmbeddingClient(
+        client=fake,
+        limiter=TokenBucket(rate_per_second=1e9, capacity=1e9),
+        batch_size=AdaptiveBatchSize(batch_size),
+        max_retries=max_retries,
+        backoff_base=1.0,
+        backoff_max=3.0,
+    )
+
+
+def test_retries_server_errors_with_exponential_backoff(sleeps):
+    fake = FakeClient([api_error(503), api_error(500), api_error(502)])
+    client = make_client(fake)
+
+    assert asyncio.run(client.embed(["a", "bb"])) == [[1.0], [2.0]]
+    assert sleeps == [1.0, 2.0, 3.0]
+    assert len(fake.calls) == 4
+
+
+def test_gives_up_after_max_retries_and_does_not_retry_client_errors(sleeps):
+    client = make_client(FakeClient([api_error(503)] * 5), max_retries=2)
+    with pytest.raises(errors.APIError):
+        asyncio.run(client.embed(["a"]))
+    assert len(sleeps) == 2
+
+    fake = FakeClient([api_error(400, "INVALID_ARGUMENT")])
+    with pytest.raises(errors.APIError):
+        asyncio.run(make_client(fake).embed(["a", "b"]))
+    assert len(fake.calls) == 1
+
+
+def test_rate_limit_resplits_the_batch_to_the_lowered_size(sleeps):
+    fake = FakeClient([api_error(429, "RESOURCE_EXHAUSTED")])
+    client = make_client(fake, batch_size=8)
+    texts = [str(i) * i for i in range(1, 9)]
+
+    result = asyncio.run(client.embed(texts))
+
+    assert result == [[float(i)] for i in range(1, 9)]
+    assert [len(call) for call in fake.calls] == [8, 4, 4]
+
+
+def test_oversized_batch_is_split_until_it_fits(sleeps):
+    fake = FakeClient(max_batch=2)
+    client = make_client(fake, batch_size=8)
+    texts = [str(i) * i for i in range(1, 8)]
+
+    result = asyncio.run(client.embed(texts))
+
+    assert result == [[float(i)] for i in range(1, 8)]
+    assert all(len(call) <= 2 for call in fake.calls[-4:])
+    assert client.batch_size.value < 8
+    assert sleeps == []
+
+
+def test_only_batch_field_violations_count_as_too_large():
+    assert embedding_client._is_too_large(api_error(413))
+    assert embedding_client._is_too_large(
+        api_error(400, "INVALID_ARGUMENT", [TOO_MANY_REQUESTS])
+    )
+    # np. zły argument w opisie błędu wspominający o "batch"
+    assert not embedding_client._is_too_large(
+        errors.APIError(400, {"error": {"message": "invalid batch config"}})
+    )
+
+
+def test_token_bucket_paces_requests_after_the_burst(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(embedding_client.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate_per_second=2, capacity=2)
+
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+
+    now[0] += 2.0
+    assert bucket.reserve() == 0.0
+
+
+def test_adaptive_batch_size_halves_and_grows_by_one():
+    size = AdaptiveBatchSize(10)
+    size.decrease()
+    size.decrease()
+    assert size.value == 2
+    size.increase()
+    assert size.value == 3
+    for _ in range(20):
+        size.increase()
+    assert size.value == 10
@@ -0,0 +1,81 @@
+import io
+import json
+
+import pytest
+
+from src.data.json_stream import (
+    iter_speaker_turns,
+    iter_whisper_segments,
+    spool_upload,
+)
+from src.scripts.benchmark_alignment import DATASET_DIR
+
+
+def test_iter_whisper_segments_keeps_only_needed_fields():
+    path = DATASET_DIR / "karol_nawrocki_mentzen_whisper_segments.json"
+    with open(path, encoding="utf8") as f:
+        whisper_data = json.load(f)
+
+    with open(path, "rb") as f:
+        segments = list(iter_whisper_segments(f))
+
+    assert segments == [
+        {"start": s["start"], "end": s["end"], "text": s["text"]}
+        for s in whisper_data["segments"]
+    ]
+
+
+def test_iter_whisper_segments_applies_diff_time():
+    data = {
+        "text": "a b",
+        "segments": [
+            {"id": 0, "start": 1.0, "end": 2.0, "text": " a", "tokens": [1, 2]},
+            {"id": 1, "start": 2.5, "end": 3.0, "text": " b", "tokens": []},
+        ],
+    }
+    file = io.BytesIO(json.dumps(data).encode("utf8"))
+
+    assert list(iter_whisper_segments(file, diff_time=10)) == [
+        {"start": 11.0, "end": 12.0, "text": " a"},
+        {"start": 12.5, "end": 13.0, "text": " b"},
+    ]
+
+
+def test_iter_whisper_segments_keeps_words_when_requested():
+    words = [
+        {"word": " a", "start": 1.0, "end": 1.4, "probability": 0.9},
+        {"word": " b", "start": 1.5, "end": 2.0, "probability": 0.8},
+    ]
+    data = {"segments": [{"start": 1.0, "end": 2.0, "text": " a b", "words": words}]}
+    raw = json.dumps(data).encode("utf8")
+
+    assert list(iter_whisper_segments(io.BytesIO(raw), diff_time=10, words=True)) == [
+        {
+            "start": 11.0,
+            "end": 12.0,
+            "text": " a b",
+            "words": [
+                {"word": " a", "start": 11.0, "end": 11.4},
+                {"word": " b", "start": 11.5, "end": 12.0},
+            ],
+        }
+    ]
+    assert list(iter_whisper_segments(io.BytesIO(raw))) == [
+        {"start": 1.0, "end": 2.0, "text": " a b"}
+    ]
+
+
+def test_iter_speaker_turns_applies_diff_time():
+    file = io.BytesIO(b'[[0.5, 1.5, "SPEAKER_00"], [2, 3, "SPEAKER_01"]]')
+
+    assert list(iter_speaker_turns(file, diff_time=5)) == [
+        [5.5, 6.5, "SPEAKER_00"],
+        [7, 8, "SPEAKER_01"],
+    ]
+
+
+def test_spool_upload_rewinds_copy():
+    source = io.BytesIO(b"x" * 10)
+    spool = spool_upload(source)
+
+    assert spool.read() == b"x" * 10
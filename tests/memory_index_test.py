@@ -0,0 +1,121 @@
+import datetime
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.data.memory_index import MemoryVectorIndex
+from src.data.search_cache import SearchCache
+
+
+def _index(rows, dtype="float32"):
+    index = MemoryVectorIndex("compact", dtype)
+    index.upsert(rows)
+    return index
+
+
+def _vector(index, *values):
+    vector = np.zeros(index.dimensions, dtype=np.float32)
+    vector[: len(values)] = values
+    return vector
+
+
+def test_search_returns_ids_ordered_by_cosine_similarity():
+    index = MemoryVectorIndex("compact", "float16")
+    index.upsert(
+        [
+            (1, 10, 100, datetime.date(2024, 1, 1), _vector(index, 1, 0)),
+            (2, 10, 100, datetime.date(2024, 1, 1), _vector(index, 0, 1)),
+            (3, 10, 100, datetime.date(2024, 1, 1), _vector(index, 1, 1)),
+        ]
+    )
+
+    # długość wektora nie ma znaczenia, tylko kierunek
+    assert index.search(_vector(index, 5, 1), 2) == [1, 3]
+    assert index.search(_vector(index, 0, 1), 10) == [2, 3, 1]
+
+
+def test_filters_mask_rows_like_sql():
+    index = _index([])
+    rows = [
+        (1, 10, 100, datetime.date(2024, 1, 1), _vector(index, 1, 0)),
+        (2, 20, 100, datetime.date(2024, 6, 1), _vector(index, 1, 0.1)),
+        (3, 10, 200, None, _vector(index, 1, 0.2)),
+    ]
+    index.upsert(rows)
+    query = _vector(index, 1, 0)
+
+    assert index.search(query, 10, speaker_id=10) == [1, 3]
+    assert index.search(query, 10, conversation_id=100) == [1, 2]
+    # rozmowa bez daty nie przechodzi filtra dat
+    assert index.search(query, 10, start_date=datetime.date(2024, 2, 1)) == [2]
+    assert index.search(query, 10, end_date=datetime.date(2024, 2, 1)) == [1]
+    assert index.search(query, 10, speaker_id=30) == []
+
+
+def test_remove_and_replace_keep_the_matrix_consistent():
+    index = _index([])
+    vectors = np.random.default_rng(0).normal(size=(2001, index.dimensions))
+    index.upsert((i, 1, 100 + i % 2, None, vectors[i]) for i in range(1, 2001))
+    assert len(index) == 2000
+
+    index.remove([1, 2, 3])
+    index.replace_conversations([100], [(5000, 1, 100, None, vectors[0])])
+
+    assert len(index) == 999
+    assert index.search(vectors[0], 1, conversation_id=100) == [5000]
+    assert index.search(vectors[1999], 1) == [1999]
+    assert index.search(vectors[3], 1) != [3]
+    # nadpisanie istniejącego id nie dodaje wiersza
+    index.upsert([(1999, 2, 101, None, vectors[1])])
+    assert len(index) == 999
+    assert index.search(vectors[1], 1, speaker_id=2) == [1999]
+
+
+def test_search_cache_invalidation_notifies_listeners():
+    cache = SearchCache(maxsize=10)
+    index = _index([])
+    cache.subscribe(index.mark_dirty)
+
+    cache.invalidate_conversation(1, 2)
+    cache.invalidate_conversation(3, notify=False)
+    cache.invalidate_conversation(4, utterance_ids=[40, 41])
+
+    assert index.wait_dirty(timeout=0) == ({1, 2}, {40, 41})
+    assert index.wait_dirty(timeout=0) == (set(), set())
+
+
+def test_refresh_utterances_upserts_only_the_given_rows():
+    index = _index([])
+    index.upsert([(1, 1, 100, None, _vector(index, 1, 0))])
+    statements = []
+
+    def exec(stmt):
+        statements.append(stmt)
+        return SimpleNamespace(all=lambda: [(2, 1, 100, None, _vector(index, 0, 1))])
+
+    index.refresh_utterances(SimpleNamespace(exec=exec), [2])
+
+    # wiersze rozmowy spoza listy zostają, zapytanie filtruje po id wypowiedzi
+    assert len(index) == 2
+    assert index.conversations_of([2, 999]) == {100}
+    params = statements[0].compile().params
+    assert [2] in params.values()
+
+
+def test_load_stops_between_batches_and_keeps_the_old_index():
+    index = _index([])
+    index.upsert([(1, 1, 100, None, _vector(index, 1, 0))])
+    stop_event = threading.Event()
+
+    def partitions():
+        yield [(2, 1, 100, None, _vector(index, 0, 1))]
+        stop_event.set()
+        yield [(3, 1, 100, None, _vector(index, 1, 1))]
+
+    result = SimpleNamespace(partitions=partitions, close=lambda: None)
+    session = SimpleNamespace(exec=lambda stmt: result)
+
+    assert index.load(session, stop_event) is False
+    assert len(index) == 1
+    assert not index.ready
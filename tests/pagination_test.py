@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlmodel import Session, SQLModel, select
+
+from src.data.entities import Conversation, Speaker, Utterance
+from src.data.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12.345678901234567, 42)) == (
+        12.345678901234567,
+        42,
+    )
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_pages_cover_all_rows_once():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(
+        engine,
+        tables=[Speaker.__table__, Conversation.__table__, Utterance.__table__],
+    )
+    with Session(engine) as session:
+        conversation = Conversation(title="t", description="d")
+        session.add(conversation)
+        session.commit()
+        # powtarzające się start_time - kolejność rozstrzyga id
+        for start_time in [3, 1, 2, 2, 2, 5, 4]:
+            session.add(
+                Utterance(
+                    start_time=start_time,
+                    end_time=start_time + 1,
+                    text="x",
+                    conversation_id=conversation.id,
+                )
+            )
+        session.commit()
+
+        seen = []
+        after = None
+        while True:
+            page = session.exec(keyset_page(select(Utterance), after).limit(3)).all()
+            if not page:
+                break
+            seen.extend((u.start_time, u.id) for u in page)
+            after = encode_cursor(page[-1].start_time, page[-1].id)
+
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == 7
@@ -6,10 +6,14 @@ from src.data.process_data import (
     calculate_overlap_score,
     estimate_duration_from_text,
     combine_segments,
+    combine_segments_sweep,
+    combine_segments_by_words,
     change_speaker_name,
     numerate_speakers,
     get_segments,
+    unknown_speaker_rates,
 )
+from src.scripts.benchmark_alignment import DATASET_NAMES
 
 
 @pytest.mark.parametrize(
@@ -90,33 +94,6 @@ def test_estimate_duration_from_text():
         estimate_duration_from_text("test", method="invalid")
 
 
-@pytest.fixture
-def sample_speaker_data():
-    return [
-        (0.0, 4.0, "SPEAKER_00"),
-        (4.5, 8.0, "SPEAKER_01"),
-        (8.5, 12.0, "SPEAKER_00"),
-        (12.5, 13.5, "SPEAKER_01"),
-    ]
-
-
-@pytest.fixture
-def sample_whisper_data():
-    return {
-        "segments": [
-            {"start": 1.0, "end": 3.0, "text": "This is a test."},
-            {"start": 4.1, "end": 4.4, "text": "No match."},
-            {"start": 3.8, "end": 5.2, "text": "Multiple matches here."},
-            {"start": 8.0, "end": 9.0, "text": "Low overlap"},
-            {
-                "start": 12.0,
-                "end": 14.0,
-                "text": "This is a very very very long sentence for testing duration filter.",
-            },
-        ]
-    }
-
-
 @pytest.fixture
 def combined_result(sample_speaker_data, sample_whisper_data):
     return combine_segments(
@@ -173,3 +150,153 @@ def test_get_segments_integration():
     assert segment["speaker"] == 0
     assert segment["text"] == "Hello"
     assert segment["method"] == "exact"
+
+
+def test_combine_segments_sweep_matches_reference(
+    sample_speaker_data, sample_whisper_data
+):
+    for ratio in (0.0, 0.05, 0.25, 0.5):
+        assert combine_segments_sweep(
+            sample_speaker_data, sample_whisper_data, min_overlap_ratio=ratio
+        ) == combine_segments(
+            sample_speaker_data, sample_whisper_data, min_overlap_ratio=ratio
+        )
+
+
+def test_combine_segments_sweep_unsorted_and_overlapping_turns():
+    speaker_data = [
+        (8.0, 12.0, "SPEAKER_02"),
+        (0.0, 20.0, "SPEAKER_00"),
+        (3.0, 5.0, "SPEAKER_01"),
+        (3.0, 5.0, "SPEAKER_02"),
+    ]
+    whisper_data = {
+        "segments": [
+            {"start": 9.0, "end": 11.0, "text": "Later."},
+            {"start": 2.0, "end": 6.0, "text": "Overlapping speech here."},
+            {"start": 4.0, "end": 4.0, "text": "Empty."},
+            {"start": 25.0, "end": 26.0, "text": "Nobody."},
+        ]
+    }
+
+    assert combine_segments_sweep(speaker_data, whisper_data) == combine_segments(
+        speaker_data, whisper_data
+    )
+
+
+@pytest.mark.parametrize("name", DATASET_NAMES)
+def test_combine_segments_sweep_matches_reference_on_dataset(name, load_dataset):
+    speaker_data, whisper_data = load_dataset(name)
+
+    assert combine_segments_sweep(
+        speaker_data, whisper_data, min_overlap_ratio=0.05
+    ) == combine_segments(speaker_data, whisper_data, min_overlap_ratio=0.05)
+
+
+def test_combine_segments_by_words_splits_multiple_segment():
+    speaker_data = [
+        (0.0, 2.0, "SPEAKER_00"),
+        (2.0, 4.0, "SPEAKER_01"),
+    ]
+    whisper_data = {
+        "segments": [
+            {
+                "start": 0.5,
+                "end": 3.5,
+                "text": " Yes, indeed. No way.",
+                "words": [
+                    {"word": " Yes,", "start": 0.5, "end": 1.0},
+                    {"word": " indeed.", "start": 1.0, "end": 1.9},
+                    {"word": " No", "start": 2.1, "end": 2.5},
+                    {"word": " way.", "start": 2.5, "end": 3.5},
+                ],
+            },
+            {"start": 0.2, "end": 1.5, "text": " Exact."},
+        ]
+    }
+
+    segments, no_speaker = combine_segments_by_words(speaker_data, whisper_data)
+
+    assert no_speaker == 0
+    assert segments == [
+        {
+            "start": 0.5,
+            "end": 1.9,
+            "text": "Yes, indeed.",
+            "speaker": "SPEAKER_00",
+            "method": "words",
+        },
+        {
+            "start": 2.1,
+            "end": 3.5,
+            "text": "No way.",
+            "speaker": "SPEAKER_01",
+            "method": "words",
+        },
+        {
+            "start": 0.2,
+            "end": 1.5,
+            "text": "Exact.",
+            "speaker": "SPEAKER_00",
+            "method": "exact",
+        },
+    ]
+
+
+def test_combine_segments_by_words_without_words_matches_sweep(
+    sample_speaker_data, sample_whisper_data
+):
+    assert combine_segments_by_words(
+        sample_speaker_data, sample_whisper_data
+    ) == combine_segments_sweep(sample_speaker_data, sample_whisper_data)
+
+
+def test_combine_segments_by_words_gap_words_join_previous_speaker():
+    speaker_data = [(0.0, 1.0, "SPEAKER_00"), (2.0, 3.0, "SPEAKER_01")]
+    whisper_data = {
+        "segments": [
+            {
+                "start": 0.0,
+                "end": 3.0,
+                "text": " a b c",
+                "words": [
+                    {"word": " a", "start": 0.0, "end": 1.0},
+                    {"word": " b", "start": 1.2, "end": 1.8},
+                    {"word": " c", "start": 2.0, "end": 3.0},
+                ],
+            }
+        ]
+    }
+
+    segments, _ = combine_segments_by_words(speaker_data, whisper_data)
+
+    assert [(s["text"], s["speaker"]) for s in segments] == [
+        ("a b", "SPEAKER_00"),
+        ("c", "SPEAKER_01"),
+    ]
+    assert segments[0]["start"] == 0.0
+    assert segments[-1]["end"] == 3.0
+
+
+@pytest.mark.parametrize("name", ["karol_nawrocki_mentzen", "mentzen-trzask"])
+def test_unknown_speaker_rates_match_full_passes(name, load_dataset):
+    speaker_data, whisper_data = load_dataset(name)
+    thresholds = [0.0, 0.01, 0.05, 0.1, 0.25, 0.5]
+
+    rates = unknown_speaker_rates(speaker_data, whisper_data, thresholds)
+
+    for rate, threshold in zip(rates, thresholds):
+        _, no_speaker = combine_segments_sweep(
+            speaker_data, whisper_data, min_overlap_ratio=threshold
+        )
+        assert rate["min_overlap_ratio"] == threshold
+        assert rate["no_speaker"] == no_speaker
+        assert rate["unknown_rate"] == pytest.approx(
+            no_speaker / len(whisper_data["segments"])
+        )
+
+
+def test_unknown_speaker_rates_sample(sample_speaker_data, sample_whisper_data):
+    rates = unknown_speaker_rates(sample_speaker_data, sample_whisper_data, [0.25])
+
+    assert rates[0]["no_speaker"] == 3
@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine, text
+
+from src.data.query_metrics import (
+    InstrumentedQueuePool,
+    LatencyHistogram,
+    QueryMetrics,
+    fingerprint,
+    instrument_engine,
+    pool_stats,
+)
+
+
+def test_fingerprint_strips_values():
+    first = fingerprint(
+        "SELECT * FROM utterance WHERE id IN (%(id_1)s, %(id_2)s)  AND text = 'a'"
+    )
+    second = fingerprint("SELECT * FROM utterance WHERE id IN ($1) AND text = 'b''c'")
+
+    assert first == second == "SELECT * FROM utterance WHERE id IN (?) AND text = ?"
+
+
+def test_fingerprint_keeps_numbers_in_identifiers():
+    assert fingerprint("SELECT set_config_1 LIMIT 10") == "SELECT set_config_1 LIMIT ?"
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for elapsed_ms in [0.5] * 90 + [40] * 9 + [20000]:
+        histogram.observe(elapsed_ms)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["p50_ms"] == 1
+    assert snapshot["p95_ms"] == 50
+    assert snapshot["p99_ms"] == 50
+    assert snapshot["max_ms"] == 20000
+    assert snapshot["buckets"]["le_1"] == 90
+    assert snapshot["buckets"]["inf"] == 1
+
+
+def test_query_metrics_limits_distinct_statements():
+    metrics = QueryMetrics(max_statements=1)
+    metrics.observe("SELECT 1", 1.0)
+    metrics.observe("SELECT 2", 1.0)
+    metrics.observe("SELECT a FROM b", 1.0)
+
+    rows = {row["statement"]: row["count"] for row in metrics.snapshot()}
+    assert rows == {"SELECT ?": 2, QueryMetrics.OTHER: 1}
+
+
+def test_instrumented_engine_records_queries_and_pool_usage():
+    engine = create_engine(
+        "sqlite://", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=0
+    )
+    metrics = QueryMetrics()
+    instrument_engine(engine, metrics)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+        assert pool_stats(engine)["checked_out"] == 1
+
+    [row] = metrics.snapshot()
+    assert row["statement"] == "SELECT ?"
+    assert row["count"] == 2
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["waiting"] == 0
+    assert stats["checkout_wait"]["count"] == 1
@@ -0,0 +1,43 @@
+from src.data.search_cache import SearchCache
+
+
+def test_search_cache_normalizes_query_and_keeps_filters_apart():
+    cache = SearchCache(maxsize=10)
+    cache.set(cache.key("full-text", "  debata  o   podatkach", 1, limit=20), "a")
+
+    assert cache.get(cache.key("full-text", "debata o podatkach", 1, limit=20)) == "a"
+    assert cache.get(cache.key("full-text", "debata o podatkach", 1, limit=5)) is None
+    assert cache.get(cache.key("hybrid", "debata o podatkach", 1, limit=20)) is None
+
+
+def test_invalidating_a_conversation_skips_only_its_entries_and_global_ones():
+    cache = SearchCache(maxsize=10)
+    first = cache.key("similarity", "q", 1)
+    second = cache.key("similarity", "q", 2)
+    everywhere = cache.key("similarity", "q", None)
+    for key in (first, second, everywhere):
+        cache.set(key, key)
+
+    cache.invalidate_conversation(1)
+
+    assert cache.get(cache.key("similarity", "q", 1)) is None
+    assert cache.get(cache.key("similarity", "q", None)) is None
+    assert cache.get(cache.key("similarity", "q", 2)) == second
+
+
+def test_result_computed_before_invalidation_is_not_served():
+    cache = SearchCache(maxsize=10)
+    key = cache.key("similarity", "q", 1)
+    cache.invalidate_conversation(1)
+    cache.set(key, "stale")
+
+    assert cache.get(cache.key("similarity", "q", 1)) is None
+
+
+def test_clear_drops_every_entry():
+    cache = SearchCache(maxsize=10)
+    key = cache.key("similarity", "q", None)
+    cache.clear()
+    cache.set(key, "stale")
+
+    assert cache.get(cache.key("similarity", "q", None)) is None
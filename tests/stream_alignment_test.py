@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from src.data.process_data import get_segments
+from src.data.stream_alignment import (
+    StreamingAligner,
+    astream_segments,
+    stream_segments,
+)
+
+
+@pytest.mark.parametrize("name", ["karol_nawrocki_mentzen", "mentzen-trzask"])
+def test_stream_segments_matches_get_segments(name, load_dataset):
+    speaker_data, whisper_data = load_dataset(name)
+
+    streamed = list(stream_segments(iter(speaker_data), iter(whisper_data["segments"])))
+
+    assert streamed == get_segments(speaker_data, whisper_data)
+
+
+def test_astream_segments_matches_get_segments(load_dataset):
+    speaker_data, whisper_data = load_dataset("karol_nawrocki_mentzen")
+
+    async def produce(items):
+        for item in items:
+            await asyncio.sleep(0)
+            yield item
+
+    async def collect():
+        return [
+            segment
+            async for segment in astream_segments(
+                produce(speaker_data), produce(whisper_data["segments"])
+            )
+        ]
+
+    assert asyncio.run(collect()) == get_segments(speaker_data, whisper_data)
+
+
+def test_stream_segments_yields_before_streams_end():
+    turns_pulled = []
+
+    def turns():
+        for turn in [(0.0, 2.0, "SPEAKER_00"), (2.0, 4.0, "SPEAKER_01")]:
+            turns_pulled.append(turn)
+            yield turn
+        raise AssertionError("turn stream should not be exhausted yet")
+
+    segments = stream_segments(
+        turns(), iter([{"start": 0.0, "end": 1.5, "text": "Hi."}])
+    )
+
+    first = next(segments)
+    assert first["speaker"] == 0
+    assert len(turns_pulled) == 2
+
+
+def test_streaming_aligner_keeps_buffer_bounded():
+    aligner = StreamingAligner()
+    for i in range(1000):
+        aligner.add_turn((i, i + 1.0, "SPEAKER_00"))
+        aligner.add_segment({"start": i, "end": i + 0.5, "text": "Hi."})
+        list(aligner.ready())
+
+    assert aligner.buffered <= 2
+
+
+def test_streaming_aligner_rejects_unsorted_input():
+    aligner = StreamingAligner()
+    aligner.add_turn((5.0, 6.0, "SPEAKER_00"))
+    with pytest.raises(ValueError):
+        aligner.add_turn((1.0, 2.0, "SPEAKER_00"))
+
+    aligner.add_segment({"start": 5.0, "end": 6.0, "text": "a"})
+    with pytest.raises(ValueError):
+        aligner.add_segment({"start": 1.0, "end": 2.0, "text": "b"})
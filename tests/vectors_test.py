@@ -0,0 +1,31 @@
+import math
+
+import pytest
+
+from src.data.vectors import (
+    binary_quantize,
+    compact_embedding,
+    derived_embeddings,
+)
+
+
+def test_compact_embedding_truncates_and_normalizes():
+    compact = compact_embedding([3.0, 4.0, 100.0], dimensions=2)
+
+    assert compact == pytest.approx([0.6, 0.8])
+    assert math.isclose(math.sqrt(sum(v * v for v in compact)), 1.0)
+
+
+def test_compact_embedding_keeps_zero_vector():
+    assert compact_embedding([0.0, 0.0, 1.0], dimensions=2) == [0.0, 0.0]
+
+
+def test_binary_quantize_keeps_sign_bits():
+    assert binary_quantize([0.3, -0.1, 0.0, 2.0]) == "1001"
+
+
+def test_derived_embeddings_without_embedding():
+    assert derived_embeddings(None) == {
+        "search_embedding": None,
+        "binary_embedding": None,
+    }